@@ -1 +1,5 @@
 import '@testing-library/jest-dom';
+
+// jsdom has no TextEncoder/TextDecoder, which the reply stream reader uses
+import { TextEncoder, TextDecoder } from 'util';
+Object.assign(global, { TextEncoder, TextDecoder });
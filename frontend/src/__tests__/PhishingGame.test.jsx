@@ -12,6 +12,26 @@ global.fetch = jest.fn();
 const originalLocation = window.location;
 delete window.location;
 
+// Mock a text/event-stream response whose body yields the given chunks,
+// waiting for each gate (if any) before handing out the next chunk
+const mockStreamResponse = (chunks, gates = []) => {
+  const encoder = new TextEncoder();
+  let index = 0;
+  return {
+    ok: true,
+    headers: { get: (name) => (name.toLowerCase() === 'content-type' ? 'text/event-stream' : null) },
+    body: {
+      getReader: () => ({
+        read: async () => {
+          if (gates[index]) await gates[index];
+          if (index >= chunks.length) return { done: true, value: undefined };
+          return { done: false, value: encoder.encode(chunks[index++]) };
+        }
+      })
+    }
+  };
+};
+
 describe('PhishingGame Component', () => {
   beforeEach(() => {
     // Reset all mocks before each test
@@ -350,4 +370,64 @@ describe('PhishingGame Component', () => {
     // Wait for response
     await screen.findByText(/email sent successfully/i);
   });
+
+  it('shows the reply as it streams in', async () => {
+    window.location = { ...originalLocation, search: '' };
+
+    const mockEmailResponse = {
+      success: false,
+      response: 'Hello there, who is this?',
+      securityChecks: null,
+      debugInfo: null
+    };
+    validateEmailResponse(mockEmailResponse); // Validate mock data
+
+    let finish;
+    const finished = new Promise(resolve => { finish = resolve; });
+    fetch.mockImplementationOnce(() =>
+      Promise.resolve(mockStreamResponse([
+        'event: token\ndata: {"text": "Hello there, "}\n\n',
+        // An event split across chunks
+        'event: token\ndata: {"text": "who',
+        ' is this?"}\n\n',
+        `event: done\ndata: ${JSON.stringify(mockEmailResponse)}\n\n`
+      ], [null, null, null, finished]))
+    );
+
+    const { container } = render(<PhishingGame />);
+
+    await userEvent.type(container.querySelector('#email-composer-from'), 'test@example.com');
+    await userEvent.type(container.querySelector('#email-composer-subject'), 'Test Subject');
+    await userEvent.type(container.querySelector('#email-composer-content'), 'Test Content');
+    await userEvent.click(container.querySelector('#email-composer-send-button'));
+
+    // The partial reply is shown before the final event, without a verdict
+    await screen.findByText('Hello there, who is this?');
+    expect(screen.getByText(/please wait/i)).toBeInTheDocument();
+    expect(screen.queryByText(/failed to obtain flag/i)).not.toBeInTheDocument();
+
+    finish();
+    await screen.findByText(/failed to obtain flag/i);
+    expect(fetch.mock.calls[1][0]).toBe('/api/send_email/stream');
+  });
+
+  it('shows an error sent on the reply stream', async () => {
+    window.location = { ...originalLocation, search: '' };
+
+    fetch.mockImplementationOnce(() =>
+      Promise.resolve(mockStreamResponse([
+        'event: token\ndata: {"text": "Hi"}\n\n',
+        'event: error\ndata: {"error": "Stream failed"}\n\n'
+      ]))
+    );
+
+    const { container } = render(<PhishingGame />);
+
+    await userEvent.type(container.querySelector('#email-composer-from'), 'test@example.com');
+    await userEvent.type(container.querySelector('#email-composer-subject'), 'Test Subject');
+    await userEvent.type(container.querySelector('#email-composer-content'), 'Test Content');
+    await userEvent.click(container.querySelector('#email-composer-send-button'));
+
+    await screen.findByText(/error: stream failed.*please try again/i);
+  });
 });
@@ -5,6 +5,7 @@ import EmailComposer from './EmailComposer';
 import ResponseDisplay from './ResponseDisplay';
 import GameHeader from './GameHeader';
 import DebugAnalysis from './DebugAnalysis';
+import { readEventStream, isEventStream } from '../utils/eventStream';
 
 const PhishingGame = () => {
   const [emailContent, setEmailContent] = useState({
@@ -75,7 +76,9 @@ const PhishingGame = () => {
   const sendEmail = async () => {
     setIsLoading(true);
     try {
-      const response = await fetch('/api/send_email', {
+      // Stream the reply so it shows up as it is written; the final
+      // "done" event carries the same payload as /api/send_email
+      const response = await fetch('/api/send_email/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -93,7 +96,31 @@ const PhishingGame = () => {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
-      const data = await response.json();
+      let data = null;
+      if (isEventStream(response)) {
+        let streamed = '';
+        await readEventStream(response, (event, payload) => {
+          if (event === 'token') {
+            streamed += payload.text;
+            setGameState(prev => ({
+              ...prev,
+              lastResponse: streamed,
+              success: false,
+              securityChecks: null,
+              debugInfo: null
+            }));
+          } else if (event === 'done') {
+            data = payload;
+          } else if (event === 'error') {
+            throw new Error(payload.error);
+          }
+        });
+        if (!data) {
+          throw new Error('Reply stream ended early');
+        }
+      } else {
+        data = await response.json();
+      }
       console.log('Response data:', data);  // Debug log
 
       setGameState(prev => ({
@@ -160,6 +187,7 @@ const PhishingGame = () => {
         <ResponseDisplay
           response={gameState.lastResponse}
           success={gameState.success}
+          isStreaming={isLoading}
         />
 
         {isDebugMode && (
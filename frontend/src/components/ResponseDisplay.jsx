@@ -2,7 +2,7 @@ import React from 'react';
 import { Card, CardHeader, CardTitle, CardContent } from './ui/card';
 import { Mail } from 'lucide-react';
 
-const ResponseDisplay = ({ response, success }) => {
+const ResponseDisplay = ({ response, success, isStreaming = false }) => {
   if (!response) return null;
 
   return (
@@ -18,9 +18,11 @@ const ResponseDisplay = ({ response, success }) => {
           <p className="whitespace-pre-wrap font-mono text-gray-300">
             {typeof response === 'string' ? response : JSON.stringify(response, null, 2)}
           </p>
-          <div className={`mt-4 p-2 rounded text-center font-bold ${success ? 'bg-emerald-400/20 text-emerald-400' : 'bg-red-400/20 text-red-400'}`}>
-            {success ? 'FLAG OBTAINED!' : 'FAILED TO OBTAIN FLAG!'}
-          </div>
+          {!isStreaming && (
+            <div className={`mt-4 p-2 rounded text-center font-bold ${success ? 'bg-emerald-400/20 text-emerald-400' : 'bg-red-400/20 text-red-400'}`}>
+              {success ? 'FLAG OBTAINED!' : 'FAILED TO OBTAIN FLAG!'}
+            </div>
+          )}
         </div>
       </CardContent>
     </Card>
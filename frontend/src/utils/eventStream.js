@@ -0,0 +1,50 @@
+/**
+ * Read a server-sent events response, calling onEvent for each event
+ * @param {Response} response - fetch response with a text/event-stream body
+ * @param {Function} onEvent - Called with (event name, parsed JSON data)
+ * @returns {Promise<void>} Resolves when the stream ends
+ */
+export const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (block) => {
+    let event = 'message';
+    const data = [];
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        data.push(line.slice(5).trim());
+      }
+    }
+    if (data.length) {
+      onEvent(event, JSON.parse(data.join('\n')));
+    }
+  };
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+    let end;
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      dispatch(buffer.slice(0, end));
+      buffer = buffer.slice(end + 2);
+    }
+  }
+  if (buffer.trim()) {
+    dispatch(buffer);
+  }
+};
+
+/**
+ * Whether a fetch response is a server-sent events stream
+ * @param {Response} response - fetch response
+ * @returns {boolean} True if the body can be read with readEventStream
+ */
+export const isEventStream = (response) => {
+  const contentType = response.headers && response.headers.get('content-type');
+  return Boolean(response.body && contentType && contentType.startsWith('text/event-stream'));
+};
@@ -0,0 +1,145 @@
+import asyncio
+import contextlib
+import math
+import threading
+import time
+from collections import Counter
+
+class Overloaded(Exception):
+    """Raised instead of queueing a call the server has no room for"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Server is overloaded ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _AdmissionBase:
+    """Counters and limits shared by the thread and asyncio versions.
+
+    At most max_in_flight calls run at once and at most max_queue more wait
+    for a slot, each for no longer than max_wait seconds. Anything beyond
+    that is turned away with Overloaded, whose retry_after tells clients
+    when to come back.
+    """
+
+    def __init__(self, max_in_flight=64, max_queue=128, max_wait=5.0):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.retry_after = max(1, math.ceil(max_wait))
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = Counter()
+        self.max_waited = 0.0
+
+    def _can_start(self):
+        return self.in_flight < self.max_in_flight
+
+    def _has_unclaimed_slot(self):
+        # A free slot that no waiter is about to take; newcomers may have it
+        # without overtaking the queue
+        return self.in_flight + self.queued < self.max_in_flight
+
+    def _reject(self, reason):
+        self.rejected[reason] += 1
+        raise Overloaded(reason, self.retry_after)
+
+    def _admit(self, waited=0.0):
+        self.in_flight += 1
+        self.admitted += 1
+        self.max_waited = max(self.max_waited, waited)
+
+    def saturated(self):
+        """Whether new calls are being turned away"""
+        return self.in_flight >= self.max_in_flight and self.queued >= self.max_queue
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected': dict(self.rejected),
+            'max_waited': round(self.max_waited, 3)
+        }
+
+class Admission(_AdmissionBase):
+    """Admission control for threads"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one of the max_in_flight slots for the duration of the block"""
+        self._acquire()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def _acquire(self):
+        with self._condition:
+            if self._has_unclaimed_slot():
+                self._admit()
+                return
+            if self.queued >= self.max_queue:
+                self._reject('queue_full')
+            started = time.monotonic()
+            self.queued += 1
+            try:
+                if not self._condition.wait_for(self._can_start, self.max_wait):
+                    self._reject('queue_timeout')
+                self._admit(time.monotonic() - started)
+            finally:
+                self.queued -= 1
+                # Wake the next waiter if a slot is still free, so that a
+                # notification this waiter took is not lost
+                if self._can_start():
+                    self._condition.notify()
+
+class AsyncAdmission(_AdmissionBase):
+    """Admission control for coroutines on one event loop"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = None
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        await self._acquire()
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    async def _acquire(self):
+        if self._has_unclaimed_slot():
+            self._admit()
+            return
+        if self.queued >= self.max_queue:
+            self._reject('queue_full')
+        started = time.monotonic()
+        self.queued += 1
+        try:
+            async with self._condition:
+                try:
+                    await asyncio.wait_for(self._condition.wait_for(self._can_start), self.max_wait)
+                    self._admit(time.monotonic() - started)
+                finally:
+                    # The lock is held again here, timed out or not
+                    if self._can_start():
+                        self._condition.notify()
+        except asyncio.TimeoutError:
+            self._reject('queue_timeout')
+        finally:
+            self.queued -= 1
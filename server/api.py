@@ -0,0 +1,148 @@
+"""Request handling shared by server.py (Flask) and asgi.py (Starlette).
+
+Everything here is framework independent: validation returns a status
+code and a JSON-able payload, and the payload builders return dicts. Each
+server only wraps them in its own response type and picks sync or async
+notifications.
+"""
+import logging
+from character import Character
+from config import MAX_REQUEST_BYTES, MAX_EMAIL_BODY_CHARS, MAX_SUBJECT_CHARS
+from game import format_email, timed
+from levels import game_levels
+from security_checks import perform_security_checks
+from telegram_bot import format_game_round
+
+logger = logging.getLogger(__name__)
+
+def payload_too_large(description):
+    return 413, {"error": "Email too large", "description": description}
+
+def request_too_large():
+    return payload_too_large(f"Requests are limited to {MAX_REQUEST_BYTES} bytes")
+
+def overloaded_data(e):
+    return {"error": "Server is busy", "description": str(e)}
+
+def error_data(e):
+    return {'error': str(e), 'traceback': str(e.__traceback__)}
+
+def receive_email(data, stages):
+    """Validate a send_email payload and run the security checks on it.
+
+    Returns (None, email_round) with the level, character, formatted email
+    and check results, or ((status, payload), None) if the payload is
+    invalid. The time spent in the checks is appended to stages.
+    """
+    if not data:
+        return (400, {"error": "No data provided"}), None
+
+    # Get debug mode and target character from request parameters
+    debug = data.get('debug', False)
+    target_character = data.get('target_character', 'janet')
+
+    # Get the target level and create a character instance
+    level = game_levels.get_level(target_character)
+    if not level:
+        return (404, {"error": f"Character '{target_character}' not found"}), None
+
+    character = Character(level.character)
+
+    # Extract email data
+    from_address = data.get('from')
+    subject = data.get('subject')
+    body = data.get('body')
+
+    if not all([from_address, subject, body]):
+        return (400, {"error": "Missing required fields"}), None
+
+    if len(body) > MAX_EMAIL_BODY_CHARS:
+        return payload_too_large(f"Email bodies are limited to {MAX_EMAIL_BODY_CHARS} characters"), None
+
+    if len(subject) > MAX_SUBJECT_CHARS:
+        return payload_too_large(f"Email subjects are limited to {MAX_SUBJECT_CHARS} characters"), None
+
+    email_content = format_email(from_address, character.email, subject, body)
+    # Log the email details for debugging
+    print(f"\nReceived email:\n{email_content}")
+
+    # The checks are pure CPU work bounded by MAX_EMAIL_BODY_CHARS; running
+    # them inline is cheaper than a hop to a thread
+    with timed(stages, 'checks'):
+        security_checks = perform_security_checks({
+            'from_address': from_address,
+            'subject': subject,
+            'body': body
+        }, character.supervisor_email, level.security_checks,
+            [colleague['email'] for colleague in level.character.get('known_colleagues', [])],
+            level.short_circuit_checks)
+
+    return None, {
+        'level': level,
+        'character': character,
+        'email_content': email_content,
+        'security_checks': security_checks,
+        'debug': debug
+    }
+
+def ooo_response_data(email_round, error):
+    """Character-specific Out of Office reply for when no response can be generated"""
+    ooo_response = {
+        'response': email_round['character'].get_ooo_message(),
+        'success': False
+    }
+    if email_round['debug']:
+        ooo_response['debugInfo'] = {
+            'error': str(error),
+            'email': email_round['email_content']
+        }
+    return ooo_response
+
+def game_round_message(email_round, response):
+    """The GAME_ROUND notification for a round, as a single well-formatted message"""
+    return format_game_round(
+        email_round['email_content'], email_round['character'].name, response['response'],
+        email_round['security_checks']
+    )
+
+def response_data(email_round, response):
+    """The player's response payload, with debug info only if requested"""
+    response_data = {
+        'response': response['response'],
+        'success': False
+    }
+    if email_round['debug']:
+        response_data['securityChecks'] = email_round['security_checks']
+        response_data['debugInfo'] = {
+            'email': email_round['email_content'],
+            'system_prompt': response['system_prompt'],
+            'raw_input': response['raw_input'],
+            'prompt_tokens': response['prompt_tokens']
+        }
+    return response_data
+
+def error_message(e):
+    """Log an unexpected error and return the text of its ERROR notification"""
+    logger.error(f"Error processing request: {str(e)}", exc_info=e)
+    return f"An error occurred: {str(e)}"
+
+def level_data(level_name):
+    """(status, payload) for the level info endpoint"""
+    level = game_levels.get_level(level_name)
+    if not level:
+        return 404, {"error": "Level not found"}
+    return 200, {
+        "objective": level.objective,
+        "character": level.character,
+        "tips": ["Be careful with sensitive information", "Pay attention to the sender's email"]
+    }
+
+def levels_data():
+    return {
+        "levels": [{
+            "id": level.name,
+            "name": level.name,
+            "description": level.objective,
+            "difficulty": "easy"
+        } for level in game_levels.levels.values()]
+    }
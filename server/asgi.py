@@ -0,0 +1,234 @@
+"""Async variant of the game server for ASGI servers such as uvicorn.
+
+Serves the same API as server.py, but each request awaits OpenAI and
+Telegram instead of holding a worker thread, so a single process can keep
+hundreds of player emails in flight:
+
+    uvicorn asgi:app --port 8080
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+from limits import parse_many
+from limits.storage import MemoryStorage
+from limits.strategies import FixedWindowRateLimiter
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from config import MAX_REQUEST_BYTES
+from game import (backend, format_sse, format_server_timing, get_janet_response_async,
+                  stream_janet_response_async, get_llm_stats, get_readiness, timed)
+from admission import Overloaded
+from warmup import warmup
+from notifications import notify_async
+from rate_limit_alerts import rate_limit_alerts
+import api
+
+TESTING = os.environ.get('FLASK_TESTING', 'False').lower() == 'true'
+
+# Same per-client limits as the Flask server
+SEND_EMAIL_LIMITS = parse_many("1000 per day; 1 per second")
+rate_limiter = FixedWindowRateLimiter(MemoryStorage())
+
+def client_address(request):
+    return request.client.host if request.client else "unknown"
+
+async def rate_limited(request):
+    """Return a 429 response if the client is over a limit, else None"""
+    if TESTING:
+        return None
+    address = client_address(request)
+    for limit in SEND_EMAIL_LIMITS:
+        if not rate_limiter.hit(limit, "send_email", address):
+            rate_limit_alerts.record(address, limit)
+            return JSONResponse({"error": "Too many requests", "description": str(limit)}, status_code=429)
+    return None
+
+def json_response(status_payload):
+    status, payload = status_payload
+    return JSONResponse(payload, status_code=status)
+
+async def read_json(request):
+    """Read a JSON body of at most MAX_REQUEST_BYTES, or None if there is none"""
+    try:
+        content_length = int(request.headers.get('content-length') or 0)
+    except ValueError:
+        return JSONResponse({"error": "Invalid Content-Length header"}, status_code=400)
+    if content_length > MAX_REQUEST_BYTES:
+        return json_response(api.request_too_large())
+    body = b""
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_REQUEST_BYTES:
+            return json_response(api.request_too_large())
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+async def health_check(request):
+    """Liveness: the process is up and serving requests"""
+    return JSONResponse({"status": "healthy"})
+
+async def readiness_check(request):
+    """Readiness: whether to route new traffic here (not while overloaded or upstream is down)"""
+    reasons = get_readiness()
+    if reasons:
+        return JSONResponse({"status": "not_ready", "reasons": reasons}, status_code=503)
+    return JSONResponse({"status": "ready"})
+
+def overloaded_response(e, headers=None):
+    return JSONResponse(api.overloaded_data(e), status_code=503, headers={**(headers or {}), 'Retry-After': str(e.retry_after)})
+
+async def receive_email(request):
+    """Validate a send_email request and run the security checks on it.
+
+    Returns (None, email_round) or (error response, None), like server.py.
+    """
+    data = await read_json(request)
+    if isinstance(data, JSONResponse):
+        return data, None
+    stages = []
+    error, email_round = api.receive_email(data, stages)
+    if error:
+        return json_response(error), None
+    email_round['stages'] = stages
+    return None, email_round
+
+async def game_round_data(email_round, response):
+    """Report the round to the notification sinks and build the player's response payload"""
+    await notify_async("GAME_ROUND", api.game_round_message(email_round, response))
+    return api.response_data(email_round, response)
+
+async def report_error(e):
+    await notify_async("ERROR", api.error_message(e))
+
+async def llm_stats(request):
+    return JSONResponse(get_llm_stats())
+
+async def send_email(request):
+    limited = await rate_limited(request)
+    if limited:
+        return limited
+    try:
+        error, email_round = await receive_email(request)
+        if error:
+            return error
+
+        stages = email_round['stages']
+        try:
+            with timed(stages, 'llm'):
+                response = await get_janet_response_async(
+                    email_round['email_content'], email_round['security_checks'], email_round['level'].name
+                )
+        except Overloaded as e:
+            return overloaded_response(e, {'Server-Timing': format_server_timing(stages)})
+        except Exception as e:
+            return JSONResponse(api.ooo_response_data(email_round, e), headers={'Server-Timing': format_server_timing(stages)})
+
+        with timed(stages, 'notify'):
+            response_data = await game_round_data(email_round, response)
+        return JSONResponse(response_data, headers={'Server-Timing': format_server_timing(stages)})
+    except Exception as e:
+        await report_error(e)
+        return JSONResponse(api.error_data(e), status_code=500)
+
+async def _prepend(first, rest):
+    yield first
+    async for item in rest:
+        yield item
+
+async def send_email_stream(request):
+    """Same as send_email, but streams the reply as server-sent events"""
+    limited = await rate_limited(request)
+    if limited:
+        return limited
+    try:
+        error, email_round = await receive_email(request)
+        if error:
+            return error
+    except Exception as e:
+        await report_error(e)
+        return JSONResponse(api.error_data(e), status_code=500)
+
+    replies = stream_janet_response_async(
+        email_round['email_content'], email_round['security_checks'], email_round['level'].name
+    )
+    failure = None
+    try:
+        # Wait for the first event before answering, so an overloaded
+        # server can still say 503 instead of starting the stream
+        first = await replies.__anext__()
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        first, failure = None, e
+
+    async def events():
+        if failure:
+            yield format_sse('done', api.ooo_response_data(email_round, failure))
+            return
+        try:
+            async for event, payload in _prepend(first, replies):
+                if event == 'token':
+                    yield format_sse('token', {'text': payload})
+                else:
+                    response = payload
+        except Exception as e:
+            yield format_sse('done', api.ooo_response_data(email_round, e))
+            return
+        try:
+            yield format_sse('done', await game_round_data(email_round, response))
+        except Exception as e:
+            await report_error(e)
+            yield format_sse('error', {'error': str(e)})
+
+    return StreamingResponse(events(), media_type='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+async def get_level_info(request):
+    return json_response(api.level_data(request.path_params['level_name']))
+
+async def get_available_levels(request):
+    return JSONResponse(api.levels_data())
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # With WARMUP=true, /api/ready reports warming_up until this is done
+    warming = asyncio.create_task(warmup.run_async(backend)) if warmup.enabled else None
+    yield
+    if warming:
+        warming.cancel()
+    if backend:
+        await backend.aclose()
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check, methods=['GET']),
+        Route('/api/ready', readiness_check, methods=['GET']),
+        Route('/api/stats', llm_stats, methods=['GET']),
+        Route('/api/send_email', send_email, methods=['POST']),
+        Route('/api/send_email/stream', send_email_stream, methods=['POST']),
+        Route('/api/level/{level_name}', get_level_info, methods=['GET']),
+        Route('/api/levels', get_available_levels, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Start the async server')
+    parser.add_argument('--port', type=int, help='Port to run the server on (can also be set via PORT environment variable)')
+    args = parser.parse_args()
+
+    port = args.port or int(os.environ.get('PORT') or 23925)
+    print(f"Starting async server on port {port}")
+    uvicorn.run(app, host='0.0.0.0', port=port)
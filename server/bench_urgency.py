@@ -0,0 +1,167 @@
+"""Throughput and worst-case benchmark for the urgency detector.
+
+    python bench_urgency.py                 # scaling table, 100 B to 1 MB
+    python bench_urgency.py --fuzz          # look for superlinear inputs
+"""
+import argparse
+import math
+import random
+import statistics
+import string
+import time
+from security_checks import find_urgent_keywords, normalize_text
+
+SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+
+REALISTIC_LINES = [
+    "Hi Janet,",
+    "Hope you are doing well. I wanted to follow up on the ticket from last week.",
+    "Could you send me the access details for the reporting server when you get a chance?",
+    "The quarterly review is on Thursday and I would like to have everything ready.",
+    "Thanks again for your help with the migration, it went smoothly.",
+    "Best regards,",
+    "Mark",
+]
+
+# Prefixes of real keywords that stop just short of matching
+NEAR_MISSES = [
+    "urgen", "emergenc", "immediat", "as soon as possibl", "at onc", "right awa",
+    "deadlin", "trigge", "system dow", "fire yo", "high priorit", "within 24 hour",
+]
+
+def _repeat_to(size, chunk):
+    return (chunk * (size // len(chunk) + 1))[:size]
+
+def realistic_text(size, rng):
+    lines = []
+    length = 0
+    while length < size:
+        line = rng.choice(REALISTIC_LINES)
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:size]
+
+def exclamation_run(size, rng):
+    return "!" * size
+
+def single_exclamations(size, rng):
+    return _repeat_to(size, "a! ")
+
+def capitals_run(size, rng):
+    return "A" * size
+
+def capital_pairs(size, rng):
+    return _repeat_to(size, "AB ")
+
+def near_miss_phrases(size, rng):
+    return _repeat_to(size, " ".join(NEAR_MISSES) + " ")
+
+def no_word_boundaries(size, rng):
+    return _repeat_to(size, "urgentlyx" + "triggeredx")
+
+def obfuscated(size, rng):
+    return _repeat_to(size, "u.r.g.3.n.t \u0430s\u0430p \uff21\uff33\uff21\uff30 ur\u200bgent 1mm3d1at3ly ")
+
+def separated_letters(size, rng):
+    return _repeat_to(size, "a.")
+
+CORPORA = {
+    'realistic': realistic_text,
+    'exclamations': exclamation_run,
+    'single_exclamations': single_exclamations,
+    'capitals': capitals_run,
+    'capital_pairs': capital_pairs,
+    'near_misses': near_miss_phrases,
+    'no_boundaries': no_word_boundaries,
+    'obfuscated': obfuscated,
+    'separated_letters': separated_letters,
+}
+
+def time_scan(text, repeat):
+    """Return the wall time of each of repeat scans of text, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        find_urgent_keywords(normalize_text(text))
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+def run_scaling(corpora, sizes, budget, seed):
+    """Print ns/byte, throughput and per-email p50/p99 for every corpus and size"""
+    rng = random.Random(seed)
+    print(f"{'corpus':<20} {'size':>9} {'runs':>6} {'ns/byte':>9} {'MB/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name in corpora:
+        for size in sizes:
+            text = CORPORA[name](size, rng)
+            # Aim for roughly the same total bytes scanned at every size
+            repeat = max(5, min(2000, int(budget // max(size, 1))))
+            timings = time_scan(text, repeat)
+            mean = statistics.fmean(timings)
+            print(
+                f"{name:<20} {size:>9} {repeat:>6} {mean / size * 1e9:>9.2f} "
+                f"{size / mean / 1e6:>9.2f} {percentile(timings, 0.5) * 1e3:>9.3f} "
+                f"{percentile(timings, 0.99) * 1e3:>9.3f}"
+            )
+
+def growth_exponent(generator, rng, base_size=2_000, steps=4, repeat=5):
+    """Estimate k in time ~ size**k by doubling the input size.
+
+    The minimum of several runs is used at every size to keep scheduler noise
+    out of the estimate.
+    """
+    points = []
+    for step in range(steps):
+        size = base_size * 2 ** step
+        text = generator(size, rng)
+        points.append((size, min(time_scan(text, repeat))))
+    exponents = [
+        math.log(t2 / t1) / math.log(s2 / s1)
+        for (s1, t1), (s2, t2) in zip(points, points[1:])
+        if t1 > 0 and t2 > 0
+    ]
+    return statistics.median(exponents) if exponents else 0.0
+
+def random_fragment_generator(rng):
+    """Build a generator that repeats a random mix of keyword fragments and noise"""
+    alphabet = string.ascii_letters + " !-'\n"
+    pieces = [rng.choice(NEAR_MISSES) for _ in range(rng.randint(1, 4))]
+    pieces += ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))) for _ in range(rng.randint(1, 4))]
+    rng.shuffle(pieces)
+    chunk = "".join(pieces)
+    return lambda size, _rng: _repeat_to(size, chunk)
+
+def run_fuzz(iterations, threshold, seed):
+    """Flag corpora or random inputs whose scan time grows faster than linearly"""
+    rng = random.Random(seed)
+    candidates = [(name, generator) for name, generator in CORPORA.items()]
+    for i in range(iterations):
+        generator = random_fragment_generator(rng)
+        candidates.append((f"fuzz-{i}: {generator(40, rng)!r}", generator))
+
+    flagged = 0
+    for name, generator in candidates:
+        exponent = growth_exponent(generator, rng)
+        if exponent > threshold:
+            flagged += 1
+            print(f"SUPERLINEAR k={exponent:.2f} {name}")
+    print(f"Checked {len(candidates)} inputs, {flagged} grew faster than size**{threshold}")
+    return flagged
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the urgency keyword scan')
+    parser.add_argument('--corpus', action='append', choices=sorted(CORPORA), help='Corpus to run (default: all)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Body sizes in bytes')
+    parser.add_argument('--budget', type=float, default=20_000_000, help='Approximate bytes scanned per measurement')
+    parser.add_argument('--fuzz', action='store_true', help='Search for inputs with superlinear scan time')
+    parser.add_argument('--iterations', type=int, default=200, help='Random inputs to try in fuzz mode')
+    parser.add_argument('--threshold', type=float, default=1.3, help='Growth exponent above which fuzz mode flags an input')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.fuzz:
+        raise SystemExit(1 if run_fuzz(args.iterations, args.threshold, args.seed) else 0)
+    run_scaling(args.corpus or list(CORPORA), args.sizes, args.budget, args.seed)
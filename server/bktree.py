@@ -0,0 +1,83 @@
+def levenshtein(a, b, limit=None):
+    """Edit distance between two strings.
+
+    With a limit, gives up as soon as the distance is known to exceed it and
+    returns limit + 1, which keeps far-apart comparisons cheap.
+    """
+    # Shared prefixes and suffixes (such as the mail domain) never add to
+    # the distance, so only the differing middle needs the full table
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class BKTree:
+    """Burkhard-Keller tree for nearest-neighbour lookups by edit distance.
+
+    A query only descends into children whose edge distance lies within the
+    search radius of the query's distance to the parent, so most of a large
+    directory is never compared against.
+    """
+
+    def __init__(self, words=(), distance=levenshtein):
+        self.distance = distance
+        self.root = None
+        self.size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            self.size = 1
+            return
+        node = self.root
+        while True:
+            existing, children = node
+            d = self.distance(word, existing)
+            if d == 0:
+                return
+            if d not in children:
+                children[d] = (word, {})
+                self.size += 1
+                return
+            node = children[d]
+
+    def search(self, word, radius):
+        """Return (distance, word) pairs within radius of word, closest first"""
+        if self.root is None:
+            return []
+        found = []
+        pending = [self.root]
+        while pending:
+            existing, children = pending.pop()
+            d = self.distance(word, existing)
+            if d <= radius:
+                found.append((d, existing))
+            for edge, child in children.items():
+                if d - radius <= edge <= d + radius:
+                    pending.append(child)
+        return sorted(found)
+
+    def __len__(self):
+        return self.size
@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+def estimate_size(value):
+    """Rough in-memory size of a value built from dicts, lists and scalars"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+class TTLCache:
+    """Thread-safe LRU cache with a time-to-live and a memory budget.
+
+    Entries are evicted least recently used first whenever either the entry
+    count or the estimated byte size goes over its limit.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, ttl=None, sizeof=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = self.sizeof(key) + self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self.size_bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or (self.max_bytes is not None and self.size_bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self.size_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -1,16 +1,13 @@
 from datetime import datetime
-import os
-from openai import OpenAI
 from server.config import load_env
 from security_checks import perform_security_checks, format_security_results
-
-# Initialize OpenAI client
-load_env()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY_JANET"))
+import llm
 
 class Character:
-    def __init__(self, name, role, personality, knowledge, background=None):
+    def __init__(self, name, role, personality, knowledge, background=None, level_name=None):
         self.name = name
+        # The id of the game level this character plays, for the LLM backend
+        self.level_name = level_name
         self.role = role
         self.personality = personality
         self.knowledge = knowledge
@@ -74,21 +71,21 @@ Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         system_prompt = self.get_training_prompt() + "\n" + format_security_results(security_results)
         
         try:
-            response = client.chat.completions.create(
-                model="gpt-4",
+            return llm.backend.complete(llm.CompletionRequest(
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": email_content}
                 ],
-                temperature=0.7,
-                max_tokens=150
-            )
-            return response.choices[0].message.content
+                level_name=self.level_name,
+                email_content=email_content,
+                security_results=security_results
+            ))
         except Exception as e:
             return f"Error getting response: {str(e)}"
 
 # Game characters
 janet = Character(
+    level_name="janet",
     name="Janet Thompson",
     role="IT Support Specialist at WhiteCorp",
     personality="""
@@ -0,0 +1,54 @@
+"""External clients, built on first use instead of at import time.
+
+Every client that talks to another service is a LazyClient: the Telegram
+bot is declared process-wide with lazy(name, factory), and each LLM backend
+keeps its own OpenAI clients (see llm.OpenAIBackend.client_status).
+Importing the server then opens nothing and imports neither SDK; the
+factory runs on the first get(), once per client even when several threads
+ask together. warmup.py builds all of them ahead of the first request.
+"""
+import threading
+
+class LazyClient:
+    """A client that factory() builds the first time it is needed"""
+
+    def __init__(self, name, factory):
+        self.name = name
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self):
+        return self._client is not None
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                client = self._client
+        return client
+
+    def set(self, client):
+        """Use client instead of building one"""
+        self._client = client
+
+# Clients declared so far; a later declaration under a name replaces the earlier one
+_clients = {}
+
+def lazy(name, factory):
+    """Declare a client built by factory on first use"""
+    client = LazyClient(name, factory)
+    _clients[name] = client
+    return client
+
+def build_all():
+    """Build every declared client that has not been built yet"""
+    for client in list(_clients.values()):
+        client.get()
+
+def client_status():
+    """Which declared clients have been built, by name"""
+    return {name: client.created for name, client in sorted(_clients.items())}
@@ -1,8 +1,14 @@
 from dotenv import load_dotenv
 import os
 
+_env_loaded = False
+
 def load_env():
     """Load environment variables from .env files if not already set in environment"""
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
     # Don't override existing environment variables
     load_dotenv_kwargs = {"override": False}
     
@@ -18,3 +24,11 @@ def load_env():
 
 # Load environment variables when the module is imported
 load_env()
+
+# Request limits shared by the WSGI and ASGI servers
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 256 * 1024))
+MAX_EMAIL_BODY_CHARS = int(os.environ.get('MAX_EMAIL_BODY_CHARS', 50000))
+MAX_SUBJECT_CHARS = int(os.environ.get('MAX_SUBJECT_CHARS', 1000))
+
+# Default input token budget of a level (system prompt plus the player's turn)
+PROMPT_TOKEN_BUDGET = int(os.environ.get('PROMPT_TOKEN_BUDGET', 4000))
@@ -0,0 +1,169 @@
+"""Stand-in for the OpenAI chat completions API, for load tests.
+
+Answers POST /v1/chat/completions with a canned reply after a simulated
+latency, optionally failing a share of requests, and streams when asked
+to. Point the game at it with OPENAI_BASE_URL:
+
+    python fake_openai.py --port 8099 --latency-dist lognormal --latency-ms 800 --error-rate 0.02
+    OPENAI_BASE_URL=http://localhost:8099/v1 FLASK_TESTING=true python server.py
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+DEFAULT_REPLY = """Hi,
+
+Thanks for reaching out. For anything involving access or passwords, please open a ticket with the help desk and I'll pick it up from there.
+
+Best regards,
+Janet"""
+
+class FakeSettings:
+    """How the fake upstream behaves; latencies are medians in milliseconds"""
+
+    def __init__(self, latency_dist='fixed', latency_ms=500.0, latency_spread=0.5, token_delay_ms=20.0,
+                 error_rate=0.0, error_statuses=(429, 500), retry_after=None, reply=DEFAULT_REPLY, seed=None):
+        # fixed, uniform, exponential or lognormal
+        self.latency_dist = latency_dist
+        self.latency_ms = latency_ms
+        # uniform: +/- fraction of the median, lognormal: sigma
+        self.latency_spread = latency_spread
+        self.token_delay_ms = token_delay_ms
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.retry_after = retry_after
+        self.reply = reply
+        self.seed = seed
+
+def sample_latency(settings, rng):
+    """Seconds to wait before answering, drawn from the configured distribution"""
+    median = settings.latency_ms / 1000
+    if settings.latency_dist == 'uniform':
+        return max(0.0, rng.uniform(median * (1 - settings.latency_spread), median * (1 + settings.latency_spread)))
+    if settings.latency_dist == 'exponential':
+        return rng.expovariate(math.log(2) / median) if median > 0 else 0.0
+    if settings.latency_dist == 'lognormal':
+        return rng.lognormvariate(math.log(median), settings.latency_spread) if median > 0 else 0.0
+    return median
+
+def _words(text):
+    """Split text into stream chunks that join back to it exactly"""
+    pieces = text.split(' ')
+    return [piece + ' ' for piece in pieces[:-1]] + pieces[-1:]
+
+def _completion(model, reply, prompt_tokens):
+    completion_tokens = len(reply.split())
+    return {
+        'id': f'chatcmpl-{uuid.uuid4().hex}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': reply},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+    }
+
+def _chunk(completion_id, model, delta, finish_reason=None):
+    return 'data: ' + json.dumps({
+        'id': completion_id,
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+    }) + '\n\n'
+
+def create_app(settings=None):
+    settings = settings or FakeSettings()
+    rng = random.Random(settings.seed)
+    stats = {'requests': 0, 'errors': 0, 'streams': 0}
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats['requests'] += 1
+        model = body.get('model', 'fake-model')
+        await asyncio.sleep(sample_latency(settings, rng))
+
+        if rng.random() < settings.error_rate:
+            stats['errors'] += 1
+            status = rng.choice(settings.error_statuses)
+            headers = {'retry-after': str(settings.retry_after)} if settings.retry_after is not None else None
+            return JSONResponse({'error': {
+                'message': f'Simulated upstream error {status}',
+                'type': 'rate_limit_error' if status == 429 else 'server_error',
+                'code': None
+            }}, status_code=status, headers=headers)
+
+        prompt_tokens = sum(len(str(message.get('content', '')).split()) for message in body.get('messages', []))
+        if not body.get('stream'):
+            return JSONResponse(_completion(model, settings.reply, prompt_tokens))
+
+        stats['streams'] += 1
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+
+        async def events():
+            yield _chunk(completion_id, model, {'role': 'assistant', 'content': ''})
+            for word in _words(settings.reply):
+                await asyncio.sleep(settings.token_delay_ms / 1000)
+                yield _chunk(completion_id, model, {'content': word})
+            yield _chunk(completion_id, model, {}, 'stop')
+            yield 'data: [DONE]\n\n'
+
+        return StreamingResponse(events(), media_type='text/event-stream')
+
+    async def list_models(request):
+        # What warm-up calls to open a connection
+        return JSONResponse({'object': 'list', 'data': [
+            {'id': 'fake-model', 'object': 'model', 'created': 0, 'owned_by': 'fake_openai'}
+        ]})
+
+    async def get_stats(request):
+        return JSONResponse(stats)
+
+    return Starlette(routes=[
+        Route('/v1/chat/completions', chat_completions, methods=['POST']),
+        Route('/v1/models', list_models, methods=['GET']),
+        Route('/stats', get_stats, methods=['GET']),
+    ])
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Run a fake OpenAI chat completions server')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-dist', choices=['fixed', 'uniform', 'exponential', 'lognormal'], default='fixed')
+    parser.add_argument('--latency-ms', type=float, default=500.0, help='Median time before the reply starts')
+    parser.add_argument('--latency-spread', type=float, default=0.5, help='Uniform: +/- fraction of the median; lognormal: sigma')
+    parser.add_argument('--token-delay-ms', type=float, default=20.0, help='Delay between streamed chunks')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with an error')
+    parser.add_argument('--error-status', type=int, nargs='+', default=[429, 500], help='Statuses to pick errors from')
+    parser.add_argument('--retry-after', type=float, help='Retry-After seconds to send with errors')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    app = create_app(FakeSettings(
+        latency_dist=args.latency_dist,
+        latency_ms=args.latency_ms,
+        latency_spread=args.latency_spread,
+        token_delay_ms=args.token_delay_ms,
+        error_rate=args.error_rate,
+        error_statuses=tuple(args.error_status),
+        retry_after=args.retry_after,
+        seed=args.seed
+    ))
+    print(f"Fake OpenAI server on http://localhost:{args.port}/v1")
+    uvicorn.run(app, host='0.0.0.0', port=args.port, log_level='warning')
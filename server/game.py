@@ -1,23 +1,70 @@
+import contextlib
 import os
+import time
+from collections import namedtuple
 from datetime import datetime
 import argparse
 import json
-from openai import OpenAI
 from config import load_env  # This will automatically load the environment variables
-from janet import janet
-from security_checks import perform_security_checks, format_security_results
-from telegram_bot import send_message, format_game_message
+from janet import get_janet
+from security_checks import perform_security_checks, format_security_results, security_check_registry
+from notifications import notify, notify_async, notification_stats
+from rate_limit_alerts import rate_limit_alerts
+from response_cache import create_response_cache, response_key
+from singleflight import SingleFlight, AsyncSingleFlight
+from resilience import Resilience, CircuitBreaker, CircuitOpenError
+from admission import Admission, AsyncAdmission, Overloaded
+from prompts import prompt_registry
+from tokens import count_message_tokens, truncate_to_tokens
+from warmup import warmup
+import llm
+from llm import CompletionRequest
 
-# Configure OpenAI
-api_key = os.getenv("OPENAI_API_KEY_JANET")
-if not api_key:
-    print("Warning: OPENAI_API_KEY_JANET environment variable is not set")
+# Writes the replies: OpenAI, or a local/replayed stand-in (LLM_BACKEND)
+backend = llm.backend
 
-try:
-    client = OpenAI(api_key=api_key)
-except Exception as e:
-    print(f"Error initializing OpenAI client: {str(e)}")
-    client = None
+def _circuit_changed(state):
+    print(f"LLM circuit breaker is now {state}")
+
+# Bound on backend calls in flight, with a bounded queue of calls waiting
+# for a slot; calls that find the queue full or wait longer than
+# ADMISSION_MAX_WAIT raise Overloaded, which the servers answer with a 503.
+# Cached and coalesced replies never take a slot.
+ADMISSION_LIMITS = {
+    'max_in_flight': int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64")),
+    'max_queue': int(os.getenv("ADMISSION_MAX_QUEUE", "128")),
+    'max_wait': float(os.getenv("ADMISSION_MAX_WAIT", "5"))
+}
+admission = Admission(**ADMISSION_LIMITS)
+async_admission = AsyncAdmission(**ADMISSION_LIMITS)
+
+# Retries, optional hedging and a circuit breaker around every backend call.
+# While the circuit is open calls raise CircuitOpenError, which the servers
+# answer with the character's out-of-office reply.
+upstream = Resilience(
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5")),
+        reset_timeout=float(os.getenv("OPENAI_BREAKER_RESET", "30")),
+        on_change=_circuit_changed
+    ),
+    max_attempts=int(os.getenv("OPENAI_MAX_ATTEMPTS", "3")),
+    base_delay=float(os.getenv("OPENAI_RETRY_BASE_DELAY", "0.5")),
+    max_delay=float(os.getenv("OPENAI_RETRY_MAX_DELAY", "8")),
+    hedge_percentile=float(os.getenv("OPENAI_HEDGE_PERCENTILE", "0")) or None,
+    # A hedged call and its duplicate each take a worker while the call holds
+    # an admission slot, so calls do not wait on each other for a worker
+    hedge_workers=2 * ADMISSION_LIMITS['max_in_flight']
+)
+
+# Optional cache of replies to repeated emails (LLM_CACHE_* settings)
+response_cache = create_response_cache()
+
+# Concurrent requests for the same reply wait on a single backend call
+if os.getenv("LLM_COALESCE", "true").lower() == "true":
+    completion_flight = SingleFlight()
+    async_completion_flight = AsyncSingleFlight()
+else:
+    completion_flight = async_completion_flight = None
 
 def format_email(from_address, to_address, subject, body):
     return f"""
@@ -29,9 +76,25 @@ Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 {body}
 """
 
-def get_janet_response(email_content, security_results):
-    system_prompt = janet.get_training_prompt()
-    game_turn_content = f"""
+@contextlib.contextmanager
+def timed(stages, name):
+    """Append (name, seconds) for the duration of the block to stages"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages.append((name, time.perf_counter() - started))
+
+def format_server_timing(stages):
+    """Server-Timing header value for (name, seconds) pairs"""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages)
+
+def format_sse(event, data):
+    """Encode one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _game_turn(email_content, security_results):
+    return f"""
     Player sent the following email:
     {email_content}
 
@@ -40,56 +103,291 @@ def get_janet_response(email_content, security_results):
     Keep these private as they are part of the game mechanics.
     {format_security_results(security_results)}
     """
-    
-    if not client:
-        error_msg = "Janet is currently unavailable. Please try again later."
-        print(f"Internal error: OpenAI client not initialized - Check OPENAI_API_KEY_JANET")
-        send_message(format_game_message("ERROR", "OpenAI client not initialized"))
-        return {
-            'response': error_msg,
-            'system_prompt': system_prompt,
-            'raw_input': ''
-        }
 
+def _build_messages(email_content, security_results, level_name="janet"):
+    """Assemble the request messages within the level's token budget.
+
+    The compiled system prompt already fits the budget, so only the player's
+    email is cut short when it does not fit in what is left.
+    """
+    prompt = prompt_registry.get_compiled(level_name)
+    frame_tokens = count_message_tokens([
+        {"content": prompt.text},
+        {"content": _game_turn("", security_results)}
+    ])
+    email_content = truncate_to_tokens(email_content, prompt.budget - frame_tokens)
     ai_input_messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": game_turn_content}
+        {"role": "system", "content": prompt.text},
+        {"role": "user", "content": _game_turn(email_content, security_results)}
     ]
-    
+    return prompt.text, ai_input_messages, count_message_tokens(ai_input_messages)
+
+# The collaborators a reply goes through. The servers use the process-wide
+# ones; evaluate.py passes its own backend, admission and notifier instead.
+Services = namedtuple('Services', ['backend', 'admission', 'notify'])
+
+def _services(sync, **given):
+    """The process-wide services of a flavour, with those given (not None) in their place"""
+    services = Services(backend, admission, notify) if sync else Services(backend, async_admission, notify_async)
+    return services._replace(**{name: value for name, value in given.items() if value is not None})
+
+# What every reply pipeline needs to know about one turn
+_Turn = namedtuple('_Turn', ['system_prompt', 'messages', 'prompt_tokens', 'cache_key', 'request', 'services'])
+
+def _prepare(email_content, security_results, level_name, services):
+    system_prompt, ai_input_messages, prompt_tokens = _build_messages(email_content, security_results, level_name)
+    return _Turn(system_prompt, ai_input_messages, prompt_tokens,
+                 response_key(level_name, email_content, security_results),
+                 CompletionRequest(ai_input_messages, level_name, email_content, security_results),
+                 services)
+
+def _response(text, turn, with_input=True, unavailable=False):
+    return {
+        'response': text,
+        'system_prompt': turn.system_prompt,
+        'raw_input': json.dumps(turn.messages, indent=2) if with_input else '',
+        'prompt_tokens': turn.prompt_tokens,
+        # The reply is the stand-in for a failed backend, not the character's
+        'upstream_unavailable': unavailable
+    }
+
+def _cached_response(turn):
+    cached = response_cache.get(turn.cache_key) if response_cache else None
+    if cached is None:
+        return None
+    return _response(cached, turn)
+
+def _unavailable_response(turn, with_input=True):
+    return _response("Janet is currently unavailable. Please try again later.", turn, with_input, unavailable=True)
+
+def _backend_missing():
+    print(f"Internal error: LLM backend not initialized - Check LLM_BACKEND and OPENAI_API_KEY_JANET")
+    return "LLM backend not initialized"
+
+def _finish(text, turn):
+    """Report a reply from the backend and cache it"""
+    turn.services.notify("API_RESPONSE", text)
+    if response_cache:
+        response_cache.add(turn.cache_key, text)
+    return text
+
+async def _finish_async(text, turn):
+    await turn.services.notify("API_RESPONSE", text)
+    if response_cache:
+        response_cache.add(turn.cache_key, text)
+    return text
+
+def _complete(turn):
+    """Make one backend call and cache its reply; shared by coalesced requests"""
+    backend, admission, notify = turn.services
+
+    def attempt():
+        # Report the API call before making it
+        notify("API_CALL", f"Making {backend.name} API call...")
+        return backend.complete(turn.request)
+
+    with admission.slot():
+        try:
+            text = upstream.call(attempt)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            # Report the error
+            notify("ERROR", f"{backend.name} API error: {str(e)}")
+            raise
+    return _finish(text, turn)
+
+async def _complete_async(turn):
+    backend, admission, notify = turn.services
+
+    async def attempt():
+        await notify("API_CALL", f"Making {backend.name} API call...")
+        return await backend.complete_async(turn.request)
+
+    async with admission.slot():
+        try:
+            text = await upstream.call_async(attempt)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            await notify("ERROR", f"{backend.name} API error: {str(e)}")
+            raise
+    return await _finish_async(text, turn)
+
+def _stream(turn):
+    """Yield the pieces of one streamed backend call"""
+    backend, admission, notify = turn.services
+    # The slot is held until the stream ends or the player goes away
+    with admission.slot():
+        try:
+            # Only opening the stream is retried; once tokens have gone out to
+            # the player a retry would repeat them
+            stream = upstream.call(lambda: backend.open_stream(turn.request), hedge=False)
+            notify("API_CALL", f"Streaming {backend.name} API call...")
+            yield from stream
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            notify("ERROR", f"{backend.name} API error: {str(e)}")
+            raise
+
+async def _stream_async(turn):
+    backend, admission, notify = turn.services
+    async with admission.slot():
+        try:
+            stream = await upstream.call_async(lambda: backend.open_stream_async(turn.request), hedge=False)
+            await notify("API_CALL", f"Streaming {backend.name} API call...")
+            async for delta in stream:
+                yield delta
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            await notify("ERROR", f"{backend.name} API error: {str(e)}")
+            raise
+
+def _reply(email_content, security_results, level_name, stream, services):
+    """The steps every sync reply takes: cache, backend check, then one call or stream.
+
+    Calls are coalesced and streams are not, but both go through admission
+    and the resilience wrapper. Yields ("token", text) for each piece when
+    streaming, then ("done", response). Overloaded and CircuitOpenError are
+    raised for the servers to answer; any other failure is the unavailable
+    reply.
+    """
+    turn = _prepare(email_content, security_results, level_name, services)
+    cached = _cached_response(turn)
+    if cached:
+        if stream:
+            yield "token", cached['response']
+        yield "done", cached
+        return
+
+    if not services.backend:
+        services.notify("ERROR", _backend_missing())
+        yield "done", _unavailable_response(turn, with_input=False)
+        return
+
     try:
-        # Send Telegram message before making API call
-        send_message(format_game_message("API_CALL", "Making OpenAI API call..."))
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=ai_input_messages,
-            temperature=0.6,
-            max_tokens=150
-        )
+        if stream:
+            parts = []
+            for delta in _stream(turn):
+                parts.append(delta)
+                yield "token", delta
+            text = _finish("".join(parts), turn)
+        elif completion_flight:
+            # Identical emails in flight at the same time share one call
+            text = completion_flight.do(turn.cache_key, lambda: _complete(turn))
+        else:
+            text = _complete(turn)
+    except (CircuitOpenError, Overloaded):
+        raise
+    except Exception as e:
+        print(f"LLM API error: {str(e)}")  # Keep detailed error in logs
+        yield "done", _unavailable_response(turn)
+        return
+    yield "done", _response(text, turn)
 
-        # Send Telegram message with API response
-        send_message(format_game_message("API_RESPONSE", response.choices[0].message.content))
+async def _reply_async(email_content, security_results, level_name, stream, services):
+    """Async counterpart of _reply"""
+    turn = _prepare(email_content, security_results, level_name, services)
+    cached = _cached_response(turn)
+    if cached:
+        if stream:
+            yield "token", cached['response']
+        yield "done", cached
+        return
 
-        return {
-            'response': response.choices[0].message.content,
-            'system_prompt': system_prompt,
-            'raw_input': json.dumps(ai_input_messages, indent=2)
-        }
+    if not services.backend:
+        await services.notify("ERROR", _backend_missing())
+        yield "done", _unavailable_response(turn, with_input=False)
+        return
+
+    try:
+        if stream:
+            parts = []
+            async for delta in _stream_async(turn):
+                parts.append(delta)
+                yield "token", delta
+            text = await _finish_async("".join(parts), turn)
+        elif async_completion_flight:
+            text = await async_completion_flight.do(turn.cache_key, lambda: _complete_async(turn))
+        else:
+            text = await _complete_async(turn)
+    except (CircuitOpenError, Overloaded):
+        raise
     except Exception as e:
-        error_msg = "Janet is currently unavailable. Please try again later."
-        print(f"OpenAI API error: {str(e)}")  # Keep detailed error in logs
-        
-        # Send Telegram message with error
-        send_message(format_game_message("ERROR", f"OpenAI API error: {str(e)}"))
-        
-        return {
-            'response': error_msg,
-            'system_prompt': system_prompt,
-            'raw_input': json.dumps(ai_input_messages, indent=2)
-        }
+        print(f"LLM API error: {str(e)}")
+        yield "done", _unavailable_response(turn)
+        return
+    yield "done", _response(text, turn)
+
+def get_janet_response(email_content, security_results, level_name="janet", **services):
+    """The character's reply to an email.
+
+    services may replace the process-wide backend, admission and notify
+    (see Services); the response's upstream_unavailable is True when the
+    reply is the stand-in for a failed backend.
+    """
+    for _, response in _reply(email_content, security_results, level_name, False, _services(True, **services)):
+        pass
+    return response
+
+async def get_janet_response_async(email_content, security_results, level_name="janet", **services):
+    """Async counterpart of get_janet_response"""
+    async for _, response in _reply_async(email_content, security_results, level_name, False,
+                                          _services(False, **services)):
+        pass
+    return response
+
+def stream_janet_response(email_content, security_results, level_name="janet", **services):
+    """Streaming counterpart of get_janet_response.
+
+    Yields ("token", text) for each piece of the reply as the backend generates it,
+    then ("done", response) with the same dict get_janet_response returns.
+    """
+    return _reply(email_content, security_results, level_name, True, _services(True, **services))
+
+def stream_janet_response_async(email_content, security_results, level_name="janet", **services):
+    """Async counterpart of stream_janet_response"""
+    return _reply_async(email_content, security_results, level_name, True, _services(False, **services))
+
+def get_readiness():
+    """Reasons not to send this process traffic right now; empty when ready"""
+    reasons = []
+    if not backend:
+        reasons.append('backend_unavailable')
+    if upstream.breaker.is_open():
+        reasons.append('circuit_open')
+    if admission.saturated() or async_admission.saturated():
+        reasons.append('queue_saturated')
+    if warmup.pending:
+        reasons.append('warming_up')
+    return reasons
+
+def get_llm_stats():
+    """Counters of the caches, coalescing, admission, upstream health, notifications, rate limits and warm-up"""
+    check_cache = security_check_registry.cache
+    return {
+        'response_cache': response_cache.stats() if response_cache else None,
+        'security_check_cache': check_cache.stats() if check_cache is not None else None,
+        # Wall time per check, to judge what a new, heavier check would cost
+        'security_check_timings': security_check_registry.get_timings(),
+        'coalescing': {
+            'sync': completion_flight.stats(),
+            'async': async_completion_flight.stats()
+        } if completion_flight else None,
+        'admission': {
+            'sync': admission.stats(),
+            'async': async_admission.stats()
+        },
+        'upstream': upstream.stats(),
+        'notifications': notification_stats(),
+        'rate_limits': rate_limit_alerts.stats(),
+        'warmup': warmup.stats()
+    }
 
 def check_win_condition(response):
-    return janet.knowledge['mainframe_password'] in response
+    return get_janet().knowledge['mainframe_password'] in response
 
 def play_game(debug_mode=False):
     """
@@ -97,6 +395,7 @@ def play_game(debug_mode=False):
     Debug mode controls whether to show security check results in CLI output.
     Security check results are always included in Telegram messages.
     """
+    janet = get_janet()
     print("\n=== SOCIAL ENGINEERING CHALLENGE ===")
     print("\nMission: Obtain the mainframe password from Janet Thompson")
     print("Objective: Craft an email that will convince Janet to share the password")
@@ -134,10 +433,10 @@ def play_game(debug_mode=False):
         
         # Always include security results in Telegram messages
         telegram_message = f"Player Email:\n{format_email(from_address, janet.knowledge['email'], subject, email_data['body'])}\n\nSecurity Checks:\n{security_results_formatted}"
-        send_message(format_game_message(
+        notify(
             "INPUT",
             telegram_message
-        ))
+        )
         
         # Only show security results in CLI if debug mode is enabled
         print("\nEmail sent:")
@@ -160,10 +459,10 @@ def play_game(debug_mode=False):
         }
         
         telegram_response = json.dumps(debug_info, indent=2)
-        send_message(format_game_message(
+        notify(
             "NEW GAME TURN",
             telegram_response
-        ))
+        )
         
         print("\n=== Janet's Response ===")
         print(response['response'])
@@ -171,12 +470,12 @@ def play_game(debug_mode=False):
         if check_win_condition(response['response']):
             win_message = "\nCongratulations! You've successfully obtained the mainframe password!"
             print("\n" + win_message)
-            send_message(format_game_message("GAME_WIN", win_message))
+            notify("GAME_WIN", win_message)
             break
         
         play_again = input("\nTry again? (y/n): ")
         if play_again.lower() != 'y':
-            send_message(format_game_message("GAME_END", "Player ended the game session"))
+            notify("GAME_END", "Player ended the game session")
             break
 
 if __name__ == "__main__":
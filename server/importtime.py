@@ -0,0 +1,69 @@
+"""Report what importing the server costs.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter
+and summarises the output: the total, the packages whose own module code
+took longest, the slowest single imports, and which external clients (see
+clients.py) were already built when the import finished, which should be
+none.
+
+    python importtime.py              # import server
+    python importtime.py asgi --top 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+def parse_importtime(output):
+    """(module, self_us, cumulative_us, depth) for each line of -X importtime output"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The header line
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return entries
+
+def profile_imports(module):
+    """Import module in a fresh interpreter; returns its importtime entries and which clients were built"""
+    code = (f"import {module}, clients, llm, json; "
+            f"print(json.dumps({{**clients.client_status(), **(llm.backend.client_status() if llm.backend else {{}})}}))")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr), json.loads(result.stdout.strip().splitlines()[-1])
+
+def report(module, entries, client_status, top=15):
+    """A plain-text summary of an import profile"""
+    total = next((cumulative for name, _, cumulative, depth in entries if name == module and depth == 0), 0)
+    packages = Counter()
+    for name, self_us, _, _ in entries:
+        packages[name.split('.')[0]] += self_us
+    slowest = sorted((entry for entry in entries if entry[0] != module), key=lambda entry: -entry[2])[:top]
+
+    lines = [f"import {module}: {total / 1000:.1f} ms, {len(entries)} modules"]
+    lines.append(f"\nTop {min(top, len(packages))} packages by own time:")
+    lines.extend(f"  {us / 1000:8.1f} ms  {name}" for name, us in packages.most_common(top))
+    lines.append(f"\nTop {len(slowest)} imports by cumulative time:")
+    lines.extend(f"  {cumulative / 1000:8.1f} ms  {name}" for name, _, cumulative, _ in slowest)
+    built = [name for name, created in client_status.items() if created]
+    lines.append(f"\nClients built at import: {', '.join(built) if built else 'none'}"
+                 f" (of {', '.join(client_status) or 'none declared'})")
+    return "\n".join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summarise python -X importtime for a server module')
+    parser.add_argument('module', nargs='?', default='server', help='Module to import (server or asgi)')
+    parser.add_argument('--top', type=int, default=15, help='Rows per table')
+    args = parser.parse_args()
+
+    entries, client_status = profile_imports(args.module)
+    print(report(args.module, entries, client_status, args.top))
@@ -0,0 +1,348 @@
+"""Backends that write the character's reply.
+
+game.py only talks to a backend through complete and open_stream (and
+their async counterparts), so the OpenAI API can be swapped for a deterministic local
+responder or for replies recorded earlier. LLM_BACKEND picks one:
+
+- openai: the chat completions API (LLM_MODEL, OPENAI_BASE_URL, ...)
+- local: canned replies built from the level's character and the check
+  verdicts, with no upstream latency; it never reveals the password
+- replay: replies recorded with LLM_RECORD_PATH, falling back to local
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+from clients import LazyClient
+from config import load_env  # This will automatically load the environment variables
+from levels import game_levels
+from response_cache import response_key
+
+# What a backend gets to answer: the prompt messages plus the inputs they
+# were built from, for backends that do not read prompts
+CompletionRequest = namedtuple('CompletionRequest', ['messages', 'level_name', 'email_content', 'security_results'])
+
+class LLMBackend:
+    """Base class; subclasses implement complete, and open_stream to stream"""
+
+    name = None
+
+    def complete(self, request):
+        """Return the reply to a CompletionRequest"""
+        raise NotImplementedError
+
+    def open_stream(self, request):
+        """Start the reply and return an iterator of its pieces.
+
+        Opening is split from iteration so that callers can retry opening a
+        stream but never a stream whose pieces have gone out.
+        """
+        return iter([self.complete(request)])
+
+    async def complete_async(self, request):
+        return self.complete(request)
+
+    async def open_stream_async(self, request):
+        """Like open_stream, returning an async iterator"""
+        return _as_async(self.open_stream(request))
+
+    def build_clients(self):
+        """Build the clients the backend would otherwise build on first use; none by default"""
+
+    def client_status(self):
+        """Which of the backend's clients have been built, by name"""
+        return {}
+
+    def warm_up(self):
+        """Open connections ahead of the first request; nothing to open by default"""
+
+    async def warm_up_async(self):
+        """Like warm_up, for the connections used by the async methods"""
+
+    async def aclose(self):
+        pass
+
+async def _as_async(pieces):
+    for piece in pieces:
+        yield piece
+
+class OpenAIBackend(LLMBackend):
+    name = 'openai'
+
+    def __init__(self, api_key, model="gpt-4o-mini", temperature=0.6, max_tokens=150, base_url=None,
+                 timeout=None, connect_timeout=None, max_connections=200, max_keepalive=50):
+        self.params = {"model": model, "temperature": temperature, "max_tokens": max_tokens}
+        # The SDK is imported and its clients built on first use, see clients.py.
+        # They belong to this backend rather than to the process-wide registry,
+        # so that building them never builds another backend's.
+        self._client = LazyClient('openai', lambda: _openai_client(api_key, base_url, timeout, connect_timeout))
+        self._async_client = LazyClient('openai_async', lambda: _openai_client(
+            api_key, base_url, timeout, connect_timeout, pool=(max_connections, max_keepalive)
+        ))
+
+    @property
+    def client(self):
+        return self._client.get()
+
+    @client.setter
+    def client(self, client):
+        self._client.set(client)
+
+    @property
+    def async_client(self):
+        return self._async_client.get()
+
+    @async_client.setter
+    def async_client(self, client):
+        self._async_client.set(client)
+
+    def complete(self, request):
+        response = self.client.chat.completions.create(messages=request.messages, **self.params)
+        return response.choices[0].message.content
+
+    async def complete_async(self, request):
+        response = await self.async_client.chat.completions.create(messages=request.messages, **self.params)
+        return response.choices[0].message.content
+
+    def open_stream(self, request):
+        return _deltas(self.client.chat.completions.create(messages=request.messages, stream=True, **self.params))
+
+    async def open_stream_async(self, request):
+        stream = await self.async_client.chat.completions.create(messages=request.messages, stream=True, **self.params)
+        return _async_deltas(stream)
+
+    def build_clients(self):
+        self._client.get()
+        self._async_client.get()
+
+    def client_status(self):
+        return {client.name: client.created for client in (self._client, self._async_client)}
+
+    def warm_up(self):
+        # A cheap authenticated call leaves a connection in the pool
+        self.client.models.list()
+
+    async def warm_up_async(self):
+        await self.async_client.models.list()
+
+    async def aclose(self):
+        if self._async_client.created:
+            await self.async_client.close()
+
+def _openai_client(api_key, base_url, timeout, connect_timeout, pool=None):
+    """An OpenAI client, or an AsyncOpenAI one with its own pool of (max_connections, max_keepalive)"""
+    import httpx
+    from openai import OpenAI, AsyncOpenAI
+    if timeout is not None or connect_timeout is not None:
+        timeout = httpx.Timeout(timeout, connect=connect_timeout)
+    # Retries are done by game.upstream, not by the SDK
+    if pool is None:
+        return OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+    max_connections, max_keepalive = pool
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=30
+        ),
+        timeout=timeout
+    )
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                       timeout=timeout, max_retries=0)
+
+def _deltas(stream):
+    for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+async def _async_deltas(stream):
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            yield delta
+
+_FROM_LINE = re.compile(r'^From:\s*(.+)$', re.MULTILINE)
+
+def sender_name(email_content):
+    """Guess a first name from the From: address, e.g. mark.davidson@... -> Mark"""
+    match = _FROM_LINE.search(email_content)
+    local_part = match.group(1).strip().split('@')[0] if match else ''
+    name = re.split(r'[._\-+\d]', local_part)[0]
+    return name.capitalize() if name.isalpha() else None
+
+class LocalBackend(LLMBackend):
+    """Deterministic replies from templates, for degraded mode and load tests.
+
+    The reply depends only on the level's character and on which checks
+    failed, never on the wording of the email, and it never contains the
+    password: falling back to it must not make the game easier.
+    """
+
+    name = 'local'
+
+    UNKNOWN_SENDER = ("This address doesn't match anyone in our employee directory, so I'm treating "
+                      "this email as suspicious and won't be able to help.")
+    NOT_SUPERVISOR = ("I can only act on requests like this when they come from {supervisor}. "
+                      "Please ask them to get in touch with me directly.")
+    NOT_URGENT = ("If this is about access or passwords, please open a ticket with the help desk "
+                  "and it will be handled through the usual process.")
+    ALL_PASSED = ("I understand this is urgent, but I still can't send credentials by email. "
+                  "Please raise a ticket with the help desk and I'll prioritise it.")
+
+    def complete(self, request):
+        level = game_levels.get_level(request.level_name)
+        character = level.character if level else {}
+        results = request.security_results
+        lookalike = results.get('lookalike_sender', {})
+        if ((not lookalike.get('passed', True) and not lookalike.get('skipped'))
+                or results.get('from_supervisor', {}).get('lookalike')):
+            message = self.UNKNOWN_SENDER
+        elif 'from_supervisor' in results and not results['from_supervisor']['passed']:
+            message = self.NOT_SUPERVISOR.format(supervisor=character.get('supervisor') or 'my supervisor')
+        elif not all(check['passed'] for check in results.values()):
+            message = self.NOT_URGENT
+        else:
+            message = self.ALL_PASSED
+        greeting = sender_name(request.email_content)
+        signature = character.get('name', 'IT Support').split()[0]
+        return f"Hi {greeting or 'there'},\n\n{message}\n\nBest regards,\n{signature}"
+
+    def open_stream(self, request):
+        pieces = self.complete(request).split(' ')
+        return iter([piece + ' ' for piece in pieces[:-1]] + pieces[-1:])
+
+class ReplayBackend(LLMBackend):
+    """Serve replies recorded earlier, keyed like the reply cache.
+
+    Recordings are JSON lines of {"key": ..., "response": ...}, as written
+    by RecordingBackend. Requests with no recording go to the fallback
+    backend, or raise LookupError without one.
+    """
+
+    name = 'replay'
+
+    def __init__(self, path, fallback=None):
+        self.fallback = fallback
+        self.recordings = {}
+        self.hits = 0
+        self.misses = 0
+        with open(path, encoding='utf-8') as recordings:
+            for line in recordings:
+                if line.strip():
+                    record = json.loads(line)
+                    self.recordings.setdefault(record['key'], []).append(record['response'])
+
+    def complete(self, request):
+        replies = self.recordings.get(response_key(request.level_name, request.email_content, request.security_results))
+        if replies:
+            self.hits += 1
+            return replies[0]
+        self.misses += 1
+        if self.fallback is None:
+            raise LookupError("No recorded reply for this request")
+        return self.fallback.complete(request)
+
+class RecordingBackend(LLMBackend):
+    """Pass requests to another backend and append its replies to a file"""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.name = inner.name
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, request, reply):
+        line = json.dumps({
+            'key': response_key(request.level_name, request.email_content, request.security_results),
+            'level': request.level_name,
+            'response': reply
+        })
+        with self._lock, open(self.path, 'a', encoding='utf-8') as recordings:
+            recordings.write(line + '\n')
+
+    def complete(self, request):
+        reply = self.inner.complete(request)
+        self._record(request, reply)
+        return reply
+
+    async def complete_async(self, request):
+        reply = await self.inner.complete_async(request)
+        await asyncio.to_thread(self._record, request, reply)
+        return reply
+
+    def open_stream(self, request):
+        return self._recorded(request, self.inner.open_stream(request))
+
+    async def open_stream_async(self, request):
+        return self._recorded_async(request, await self.inner.open_stream_async(request))
+
+    def _recorded(self, request, pieces):
+        parts = []
+        for piece in pieces:
+            parts.append(piece)
+            yield piece
+        self._record(request, "".join(parts))
+
+    async def _recorded_async(self, request, pieces):
+        parts = []
+        async for piece in pieces:
+            parts.append(piece)
+            yield piece
+        await asyncio.to_thread(self._record, request, "".join(parts))
+
+    def build_clients(self):
+        self.inner.build_clients()
+
+    def client_status(self):
+        return self.inner.client_status()
+
+    def warm_up(self):
+        self.inner.warm_up()
+
+    async def warm_up_async(self):
+        await self.inner.warm_up_async()
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+def create_backend():
+    """Build the backend selected by LLM_BACKEND, or None if it cannot be created"""
+    kind = os.getenv("LLM_BACKEND", "openai").lower()
+    try:
+        if kind == "local":
+            backend = LocalBackend()
+        elif kind == "replay":
+            backend = ReplayBackend(os.environ["LLM_REPLAY_PATH"], fallback=LocalBackend())
+        elif kind == "openai":
+            api_key = os.getenv("OPENAI_API_KEY_JANET")
+            if not api_key:
+                print("Warning: OPENAI_API_KEY_JANET environment variable is not set")
+            backend = OpenAIBackend(
+                api_key=api_key,
+                model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
+                temperature=float(os.getenv("LLM_TEMPERATURE", "0.6")),
+                max_tokens=int(os.getenv("LLM_MAX_TOKENS", "150")),
+                # Point at another OpenAI-compatible server, such as fake_openai.py for load tests
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                # Per-attempt timeouts
+                timeout=float(os.getenv("OPENAI_READ_TIMEOUT", "30")),
+                connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5")),
+                # Connection pool of the async client: how many OpenAI calls a single
+                # process keeps in flight, and how many idle connections it keeps warm
+                max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "200")),
+                max_keepalive=int(os.getenv("OPENAI_MAX_KEEPALIVE", "50"))
+            )
+        else:
+            raise ValueError(f"Unknown LLM_BACKEND '{kind}'")
+    except Exception as e:
+        print(f"Error initializing LLM backend: {str(e)}")
+        return None
+    if os.getenv("LLM_RECORD_PATH"):
+        backend = RecordingBackend(backend, os.environ["LLM_RECORD_PATH"])
+    return backend
+
+# The backend shared by every request in the process
+backend = create_backend()
@@ -0,0 +1,215 @@
+"""Where game events go: Telegram, a local JSONL file, or nowhere.
+
+With NOTIFY_OUTBOX_PATH set, Telegram messages go through a durable
+SQLite outbox (see outbox.py) instead of an in-memory queue, so they
+survive Telegram outages and restarts.
+
+NOTIFY_SINKS is a comma-separated list of sinks (telegram, jsonl, null);
+without it events go to Telegram when its bot token and chat id are set
+and nowhere otherwise. NOTIFY_SAMPLE_RATES keeps a share of each event
+type, e.g. "GAME_ROUND=0.01,API_CALL=0"; other types are kept at
+NOTIFY_DEFAULT_SAMPLE_RATE (default 1, everything).
+"""
+import asyncio
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import random
+import threading
+from collections import Counter
+from datetime import datetime
+from outbox import Outbox, OutboxDispatcher
+from telegram_bot import (NotificationQueue, deliver, format_game_message, telegram_configured,
+                          TELEGRAM_QUEUE_SIZE, TELEGRAM_BATCH_WINDOW, TELEGRAM_MIN_INTERVAL)
+
+class NotificationSink:
+    """Base class; subclasses implement emit"""
+
+    name = None
+    # Whether emit waits on disk or network, which notify_async keeps off the event loop
+    blocking = False
+
+    def emit(self, event_type, content):
+        raise NotImplementedError
+
+    def flush(self, timeout=None):
+        return True
+
+    def stats(self):
+        return {}
+
+class NullSink(NotificationSink):
+    name = 'null'
+
+    def emit(self, event_type, content):
+        pass
+
+class TelegramSink(NotificationSink):
+    """Queue events for the Telegram chat, delivered in the background.
+
+    The queue is a NotificationQueue or an OutboxDispatcher.
+    """
+
+    name = 'telegram'
+
+    def __init__(self, queue=None):
+        self.queue = queue or create_telegram_queue()
+
+    @property
+    def blocking(self):
+        # The outbox writes each message to SQLite; the in-memory queue only appends
+        return isinstance(self.queue, OutboxDispatcher)
+
+    def emit(self, event_type, content):
+        self.queue.put(format_game_message(event_type, content))
+
+    def flush(self, timeout=None):
+        return self.queue.flush(timeout)
+
+    def stats(self):
+        return self.queue.stats()
+
+class JsonlSink(NotificationSink):
+    """Append events to a JSON lines file, rotated at max_bytes"""
+
+    name = 'jsonl'
+    blocking = True
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backups=5):
+        self.path = path
+        self.handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                            encoding='utf-8', delay=True)
+        self.written = 0
+
+    def emit(self, event_type, content):
+        # handle() takes the handler's lock, so writes and rollovers from
+        # concurrent requests do not interleave
+        self.handler.handle(logging.makeLogRecord({'msg': json.dumps({
+            'time': datetime.now().isoformat(timespec='milliseconds'),
+            'event': event_type,
+            'content': content
+        }, ensure_ascii=False)}))
+        self.written += 1
+
+    def flush(self, timeout=None):
+        self.handler.flush()
+        return True
+
+    def stats(self):
+        return {'path': self.path, 'written': self.written}
+
+def create_telegram_queue():
+    outbox_path = os.getenv("NOTIFY_OUTBOX_PATH")
+    if not outbox_path:
+        return NotificationQueue(deliver, TELEGRAM_QUEUE_SIZE, TELEGRAM_BATCH_WINDOW, TELEGRAM_MIN_INTERVAL)
+    return OutboxDispatcher(
+        Outbox(outbox_path), deliver, TELEGRAM_BATCH_WINDOW, TELEGRAM_MIN_INTERVAL,
+        base_delay=float(os.getenv("NOTIFY_OUTBOX_RETRY_BASE_DELAY", "1")),
+        max_delay=float(os.getenv("NOTIFY_OUTBOX_RETRY_MAX_DELAY", "300")),
+        max_rows=int(os.getenv("NOTIFY_OUTBOX_MAX_ROWS", "100000"))
+    )
+
+def parse_sample_rates(text):
+    """Map event type to the share kept, from "EVENT=rate,EVENT=rate" """
+    rates = {}
+    for entry in filter(None, (part.strip() for part in (text or '').split(','))):
+        event_type, _, rate = entry.partition('=')
+        rates[event_type.strip().upper()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+class Notifier:
+    """Send each event to every sink, keeping only a sample of noisy event types"""
+
+    def __init__(self, sinks, sample_rates=None, default_rate=1.0, rng=random.random):
+        self.sinks = list(sinks)
+        self.sample_rates = sample_rates or {}
+        self.default_rate = default_rate
+        self.rng = rng
+        self.sent = Counter()
+        self.sampled_out = Counter()
+        self._lock = threading.Lock()
+
+    def keep(self, event_type):
+        rate = self.sample_rates.get(event_type, self.default_rate)
+        return rate >= 1 or (rate > 0 and self.rng() < rate)
+
+    def _sample(self, event_type):
+        """Count the event as sent or sampled out; True if it is sent"""
+        kept = self.keep(event_type)
+        with self._lock:
+            (self.sent if kept else self.sampled_out)[event_type] += 1
+        return kept
+
+    def _emit(self, sinks, event_type, content):
+        for sink in sinks:
+            try:
+                sink.emit(event_type, content)
+            except Exception as e:
+                print(f"Failed to send notification to {sink.name}: {e}")
+
+    def notify(self, event_type, content):
+        if self._sample(event_type):
+            self._emit(self.sinks, event_type, content)
+
+    async def notify_async(self, event_type, content):
+        """Like notify, with the blocking sinks run in a worker thread"""
+        if not self._sample(event_type):
+            return
+        self._emit([sink for sink in self.sinks if not sink.blocking], event_type, content)
+        blocking = [sink for sink in self.sinks if sink.blocking]
+        if blocking:
+            await asyncio.to_thread(self._emit, blocking, event_type, content)
+
+    def flush(self, timeout=None):
+        return all([sink.flush(timeout) for sink in self.sinks])
+
+    def stats(self):
+        return {
+            'sinks': {sink.name: sink.stats() for sink in self.sinks},
+            'sent': dict(self.sent),
+            'sampled_out': dict(self.sampled_out)
+        }
+
+def create_sink(name):
+    if name == 'telegram':
+        if not telegram_configured():
+            print("Warning: JANET_SEG_BOT_TOKEN or JANET_SEG_BOT_CHAT_ID is not set, not sending to Telegram")
+            return NullSink()
+        return TelegramSink()
+    if name == 'jsonl':
+        return JsonlSink(
+            os.getenv("NOTIFY_JSONL_PATH", "notifications.jsonl"),
+            max_bytes=int(os.getenv("NOTIFY_JSONL_MAX_BYTES", str(10 * 1024 * 1024))),
+            backups=int(os.getenv("NOTIFY_JSONL_BACKUPS", "5"))
+        )
+    if name == 'null':
+        return NullSink()
+    raise ValueError(f"Unknown notification sink '{name}'")
+
+def create_notifier():
+    """Build the Notifier described by the NOTIFY_* settings"""
+    default_sinks = 'telegram' if telegram_configured() else 'null'
+    names = [name.strip().lower() for name in os.getenv("NOTIFY_SINKS", default_sinks).split(',') if name.strip()]
+    return Notifier(
+        [create_sink(name) for name in names],
+        sample_rates=parse_sample_rates(os.getenv("NOTIFY_SAMPLE_RATES")),
+        default_rate=float(os.getenv("NOTIFY_DEFAULT_SAMPLE_RATE", "1"))
+    )
+
+notifier = create_notifier()
+
+# Give queued messages a moment to go out when the process exits
+atexit.register(notifier.flush, 5)
+
+def notify(event_type, content):
+    """Report a game event to the configured sinks without waiting on them"""
+    notifier.notify(event_type, content)
+
+async def notify_async(event_type, content):
+    """Same as notify, for coroutines; file and database writes happen off the event loop"""
+    await notifier.notify_async(event_type, content)
+
+def notification_stats():
+    return notifier.stats()
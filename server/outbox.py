@@ -0,0 +1,199 @@
+"""Durable outbox for notifications.
+
+Messages are written to a SQLite table (WAL mode, one small insert each)
+and a background dispatcher delivers them, deleting rows only once they
+are delivered. Failed deliveries are retried with exponential backoff, and
+anything left over when the process stops is sent after the next start,
+so delivery is at least once. Enabled with NOTIFY_OUTBOX_PATH.
+"""
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from telegram_bot import MAX_MESSAGE_LENGTH, pack_keyed
+
+class Outbox:
+    """SQLite table of messages waiting for delivery, oldest first"""
+
+    def __init__(self, path):
+        self.path = path
+        # Autocommit; the few multi-row changes use explicit transactions
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # With WAL a commit is durable against process crashes without an fsync
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    message TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL DEFAULT 0
+                )""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_attempt, id)")
+
+    def add(self, message, now=None):
+        with self._lock:
+            self._db.execute("INSERT INTO outbox (message, created) VALUES (?, ?)", (message, now or time.time()))
+
+    def due(self, now, limit=100):
+        """Up to limit (id, message, attempts) rows ready to be tried, oldest first"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, message, attempts FROM outbox WHERE next_attempt <= ? ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+
+    def next_due(self):
+        """When the earliest postponed row becomes due, or None when empty"""
+        with self._lock:
+            return self._db.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()[0]
+
+    def delete(self, ids):
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in ids])
+            self._db.execute("COMMIT")
+
+    def postpone(self, retries):
+        """Record a failed attempt for each (id, next_attempt) pair"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt = ? WHERE id = ?",
+                [(next_attempt, row_id) for row_id, next_attempt in retries]
+            )
+            self._db.execute("COMMIT")
+
+    def trim(self, max_rows):
+        """Delete the oldest rows beyond max_rows; returns how many went"""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM outbox WHERE id <= (SELECT id FROM outbox ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (max_rows,)
+            )
+            return cursor.rowcount
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+class OutboxDispatcher:
+    """Deliver outbox messages from a background thread.
+
+    Takes the place of telegram_bot.NotificationQueue, with the same
+    batching, packing and pacing, but messages survive failed deliveries
+    and restarts. A failed message is retried after base_delay * 2 **
+    attempts seconds (with jitter, at most max_delay). Past max_rows the
+    oldest messages are dropped.
+    """
+
+    def __init__(self, outbox, deliver, batch_window=0.0, min_interval=0.0, limit=MAX_MESSAGE_LENGTH,
+                 base_delay=1.0, max_delay=300.0, max_rows=100000, batch_size=100):
+        self.outbox = outbox
+        self._deliver = deliver
+        self.batch_window = batch_window
+        self.min_interval = min_interval
+        self.limit = limit
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._idle = True
+        self._next_send = 0.0
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        # Deliver what a previous process left behind
+        if outbox.count():
+            self._idle = False
+            self.start()
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='outbox', daemon=True)
+                self._thread.start()
+
+    def put(self, message):
+        self.outbox.add(message)
+        with self._condition:
+            self.enqueued += 1
+            self._idle = False
+        self.start()
+        self._wake.set()
+
+    def backoff(self, attempts):
+        return min(self.max_delay, self.base_delay * 2 ** attempts) * random.uniform(0.5, 1.0)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while True:
+            self.dropped += max(0, self.outbox.trim(self.max_rows))
+            rows = self.outbox.due(time.time(), self.batch_size)
+            if not rows:
+                self._wait_for_work()
+                continue
+            self._dispatch(loop, rows)
+
+    def _wait_for_work(self):
+        with self._condition:
+            self._wake.clear()
+            # A put() from here on wakes us again; one just before must not be missed
+            if self.outbox.due(time.time(), 1):
+                return
+            self._idle = True
+            self._condition.notify_all()
+        next_due = self.outbox.next_due()
+        self._wake.wait(max(0.0, next_due - time.time()) if next_due is not None else None)
+        # Let messages arriving together go out together
+        time.sleep(self.batch_window)
+
+    def _dispatch(self, loop, rows):
+        attempts = {row_id: row_attempts for row_id, _, row_attempts in rows}
+        failed = set()
+        for ids, text in pack_keyed([(row_id, message) for row_id, message, _ in rows], self.limit):
+            delay = self._next_send - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                delivered = loop.run_until_complete(self._deliver(text))
+            except Exception as e:
+                print(f"Failed to send message to Telegram: {e}")
+                delivered = False
+            self._next_send = time.monotonic() + self.min_interval
+            if delivered:
+                self.sent += 1
+            else:
+                self.failed += 1
+                failed |= ids
+        # A message split over several texts is only done when all of them went out
+        self.outbox.delete([row_id for row_id in attempts if row_id not in failed])
+        if failed:
+            self.retried += len(failed)
+            now = time.time()
+            self.outbox.postpone([(row_id, now + self.backoff(attempts[row_id])) for row_id in failed])
+
+    def flush(self, timeout=None):
+        """Wait until every message due has been tried; False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._idle, timeout)
+
+    def stats(self):
+        return {
+            'queued': self.outbox.count(),
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retried': self.retried,
+            'dropped': self.dropped
+        }
@@ -0,0 +1,122 @@
+import threading
+from collections import namedtuple
+from config import PROMPT_TOKEN_BUDGET
+from levels import game_levels
+from tokens import count_tokens
+
+# Tokens of a level's budget kept free of examples for the player's email
+MIN_TURN_TOKENS = 1000
+
+CompiledPrompt = namedtuple('CompiledPrompt', ['text', 'tokens', 'budget', 'examples'])
+
+EMAIL_STYLE_GUIDE = """EMAIL STYLE GUIDE:
+1. Keep responses brief and informal but professional
+2. Skip greetings like "Dear Sir/Madam"
+3. Don't include your title or contact details in the signature
+4. Use this format for all responses:
+
+Hi [name],
+
+[your message]
+
+Best regards,
+[your name]
+5. Act like a human and, in particular, like an employee of WhiteCorp."""
+
+def _article(word):
+    return "an" if word[:1].lower() in "aeiou" else "a"
+
+def format_colleagues(colleagues):
+    return "\n".join([
+        f"- {c['name']} ({c['role']}) - {c['email']}"
+        for c in colleagues
+    ])
+
+def format_example(example):
+    return f"EXAMPLE INTERACTION:\n{example['email']}\nYOUR RESPONSE:\n{example['response']}"
+
+def fit_examples(examples, max_tokens):
+    """Leading examples whose sections fit in max_tokens; the rest are dropped"""
+    fitted = []
+    for example in examples:
+        max_tokens -= count_tokens(format_example(example)) + 1
+        if max_tokens < 0:
+            break
+        fitted.append(example)
+    return fitted
+
+def token_budget(level):
+    return level.token_budget or PROMPT_TOKEN_BUDGET
+
+def build_system_prompt(level, examples=None):
+    """Render the system prompt that plays the character of a level"""
+    character = level.character
+    sections = [
+        f"You are {character['name']}, {_article(character['role'])} {character['role']} at WhiteCorp.",
+        f"""PERSONAL DETAILS:
+Email: {character['email']}
+Role: {character['role']}
+Desk Location: {character['desk_location']}""",
+        f"""SUPERVISOR:
+{character['supervisor']} ({character['supervisor_email']})""",
+        f"""COLLEAGUES:
+{format_colleagues(character.get('known_colleagues', []))}""",
+        f"""PERSONALITY:
+{character['personality']}"""
+    ]
+    if level.background:
+        sections.append(f"""BACKGROUND:
+{level.background['recent_events']}
+{level.background['common_tasks']}""")
+    sections.append(EMAIL_STYLE_GUIDE)
+    if examples:
+        sections.append("Here are some example interactions to guide your responses:")
+        sections.extend(format_example(example) for example in examples)
+    return "\n\n".join(sections)
+
+def compile_prompt(level):
+    """Render a level's prompt with as many examples as its token budget allows"""
+    budget = token_budget(level)
+    base = build_system_prompt(level)
+    examples = fit_examples(level.examples, budget - MIN_TURN_TOKENS - count_tokens(base))
+    text = build_system_prompt(level, examples) if examples else base
+    return CompiledPrompt(text, count_tokens(text), budget, len(examples))
+
+class PromptRegistry:
+    """System prompts of every level, rendered once and reused per request.
+
+    Nothing is rendered until the first lookup or an explicit compile(),
+    which the warm-up runs, since counting tokens loads the tokenizer.
+    Adding a level through GameLevels.add_level drops the compiled prompts,
+    which are rebuilt on the next lookup.
+    """
+
+    def __init__(self, levels):
+        self.levels = levels
+        self._prompts = None
+        self._lock = threading.Lock()
+        levels.add_listener(self.invalidate)
+
+    def compile(self):
+        prompts = {name: compile_prompt(level) for name, level in self.levels.levels.items()}
+        with self._lock:
+            self._prompts = prompts
+        return prompts
+
+    def invalidate(self, *_):
+        with self._lock:
+            self._prompts = None
+
+    def get_compiled(self, level_name):
+        """Return the CompiledPrompt of a level, raising KeyError if there is none"""
+        prompts = self._prompts
+        if prompts is None:
+            prompts = self.compile()
+        return prompts[level_name.lower()]
+
+    def get(self, level_name):
+        """Return the system prompt of a level, raising KeyError if there is none"""
+        return self.get_compiled(level_name).text
+
+# Create a single registry over the game levels
+prompt_registry = PromptRegistry(game_levels)
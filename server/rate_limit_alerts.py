@@ -0,0 +1,110 @@
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+from notifications import notify
+
+# Seconds between RATE_LIMIT summaries, and how many clients each one names
+RATE_LIMIT_SUMMARY_INTERVAL = float(os.getenv("RATE_LIMIT_SUMMARY_INTERVAL", "60"))
+RATE_LIMIT_SUMMARY_TOP = int(os.getenv("RATE_LIMIT_SUMMARY_TOP", "10"))
+# How many clients an interval counts one by one; the rest are counted as others
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "1000"))
+# Longest client or limit name a summary quotes
+MAX_NAME_CHARS = 64
+
+def _shorten(name):
+    name = str(name)
+    return name if len(name) <= MAX_NAME_CHARS else name[:MAX_NAME_CHARS - 3] + "..."
+
+class RateLimitAlerts:
+    """Count rejected requests and report them as one periodic summary.
+
+    Recording a rejection only bumps in-memory counters, so a burst of
+    abusive requests costs no outbound calls. Every interval seconds, if
+    anything was rejected, one RATE_LIMIT event lists the totals, the
+    rejection rate, the rejections per limit and the top clients.
+
+    At most max_clients clients are counted one by one. When that many are
+    tracked, the least-hit half is folded into an "others" count, so memory
+    and summary size stay bounded however many addresses take part.
+    """
+
+    def __init__(self, interval=60.0, top=10, notify=notify, clock=time.monotonic, max_clients=1000):
+        self.interval = interval
+        self.top = top
+        self.max_clients = max(max_clients, 1)
+        self.notify = notify
+        self.clock = clock
+        self.total = 0
+        self.summaries = 0
+        self._clients = Counter()
+        self._others = 0
+        self._limits = Counter()
+        self._since = clock()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, client, limit):
+        with self._lock:
+            if client not in self._clients and len(self._clients) >= self.max_clients:
+                self._fold_clients()
+            self._clients[client] += 1
+            self._limits[str(limit)] += 1
+            self.total += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rate-limit-alerts', daemon=True)
+                self._thread.start()
+
+    def _fold_clients(self):
+        """Keep the most-hit half of the tracked clients, counting the rest as others"""
+        kept = Counter(dict(self._clients.most_common(self.max_clients // 2)))
+        self._others += sum(self._clients.values()) - sum(kept.values())
+        self._clients = kept
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.report()
+
+    def summary(self):
+        """Take the counts since the last summary; returns its text, or None if there were none"""
+        with self._lock:
+            clients, others, limits = self._clients, self._others, self._limits
+            self._clients, self._others, self._limits = Counter(), 0, Counter()
+            since, self._since = self._since, self.clock()
+        rejected = sum(clients.values()) + others
+        if not rejected:
+            return None
+        elapsed = max(self._since - since, 1e-9)
+        sources = f"{len(clients)} clients"
+        if others:
+            sources = f"at least {sources} ({others} from clients not tracked)"
+        lines = [f"{rejected} requests rejected in {elapsed:.0f}s ({rejected / elapsed:.1f}/s) from {sources}"]
+        lines.append("\nBy limit:")
+        lines.extend(f"- {_shorten(limit)}: {count}" for limit, count in limits.most_common(self.top))
+        lines.append(f"\nTop {min(self.top, len(clients))} clients:")
+        lines.extend(f"- {_shorten(client)}: {count} ({count / elapsed:.1f}/s)"
+                     for client, count in clients.most_common(self.top))
+        return "\n".join(lines)
+
+    def report(self):
+        """Send a summary if anything was rejected since the last one"""
+        text = self.summary()
+        if text:
+            self.summaries += 1
+            self.notify("RATE_LIMIT", text)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rejected': self.total,
+                'pending': sum(self._clients.values()) + self._others,
+                'summaries': self.summaries
+            }
+
+rate_limit_alerts = RateLimitAlerts(RATE_LIMIT_SUMMARY_INTERVAL, RATE_LIMIT_SUMMARY_TOP,
+                                    max_clients=RATE_LIMIT_MAX_CLIENTS)
+
+# Report what was counted since the last summary before the process exits
+atexit.register(rate_limit_alerts.report)
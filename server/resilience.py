@@ -0,0 +1,280 @@
+import asyncio
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+def is_transient(error):
+    """Whether error is worth another attempt: the request may well succeed if repeated"""
+    # Only the OpenAI SDK raises these, so it need not be imported up front
+    openai = sys.modules.get('openai')
+    return openai is not None and isinstance(error, (
+        openai.APIConnectionError,  # includes APITimeoutError
+        openai.RateLimitError,
+        openai.InternalServerError,
+    ))
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream the circuit breaker considers down"""
+
+class CircuitBreaker:
+    """Stop calling an upstream after repeated failures, then probe it again.
+
+    After failure_threshold consecutive transient failures the circuit opens
+    and calls fail fast for reset_timeout seconds. Then a single probe call is
+    let through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, on_change=None, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_change = on_change
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through right now"""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError("Upstream is unavailable, not calling it until it recovers")
+
+    def is_open(self):
+        """Whether calls are failing fast right now.
+
+        The state only leaves OPEN when a call arrives after reset_timeout, so
+        an elapsed timeout already counts as half-open here: a process that
+        stops getting traffic while open must still report itself usable.
+        """
+        with self._lock:
+            return self.state == self.OPEN and self.clock() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                if self.state != self.OPEN:
+                    self._set_state(self.OPEN)
+
+    def record_ignored(self):
+        """A call ended without telling anything about upstream health"""
+        with self._lock:
+            self._probing = False
+
+    def _set_state(self, state):
+        self.state = state
+        if self.on_change:
+            self.on_change(state)
+
+class LatencyTracker:
+    """Sliding window of recent call durations"""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction, min_samples=1):
+        """The given quantile of the window, or None with fewer than min_samples"""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def retry_after(error):
+    """Seconds the server asked us to wait in a Retry-After header, if any"""
+    response = getattr(error, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+class Resilience:
+    """Retries, hedging and a circuit breaker around one upstream.
+
+    Transient errors are retried up to max_attempts times with full-jitter
+    exponential backoff, or after the server's Retry-After when it sends
+    one. A Retry-After longer than max_delay is not waited out: the error is
+    raised instead of retrying before the server allows. With hedge_percentile set, a call still running after that
+    percentile of recent latencies gets a duplicate; the first to succeed
+    wins. Sync hedged calls run on a pool of hedge_workers threads, which
+    bounds how many of them are in flight; size it for every caller's call
+    and duplicate (game.py uses twice the admission limit).
+    """
+
+    def __init__(self, breaker=None, max_attempts=3, base_delay=0.5, max_delay=8.0,
+                 hedge_percentile=None, hedge_min_samples=20, hedge_workers=None, sleep=time.sleep,
+                 async_sleep=asyncio.sleep):
+        self.breaker = breaker or CircuitBreaker()
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_workers = hedge_workers
+        self.latency = LatencyTracker()
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        self.retries = 0
+        self.hedges = 0
+        self._executor = None
+
+    def backoff(self, attempt, error):
+        """Delay before retry number attempt (1-based) after error, or None if the server asks for longer than max_delay"""
+        requested = retry_after(error)
+        if requested is not None:
+            return requested if requested <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def hedge_delay(self):
+        if not self.hedge_percentile:
+            return None
+        return self.latency.percentile(self.hedge_percentile / 100, self.hedge_min_samples)
+
+    def _attempts(self):
+        """Yield attempt numbers, checking the breaker before each one"""
+        for attempt in range(1, self.max_attempts + 1):
+            self.breaker.before_call()
+            yield attempt
+
+    def _failed(self, attempt, error):
+        """Record a failed attempt and return the delay before the next, or None to give up"""
+        if not is_transient(error):
+            self.breaker.record_ignored()
+            return None
+        self.breaker.record_failure()
+        if attempt >= self.max_attempts:
+            return None
+        delay = self.backoff(attempt, error)
+        if delay is not None:
+            self.retries += 1
+        return delay
+
+    def call(self, fn, hedge=True):
+        for attempt in self._attempts():
+            started = time.monotonic()
+            try:
+                result = self._hedged(fn) if hedge else fn()
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise
+                self.sleep(delay)
+                continue
+            self.latency.record(time.monotonic() - started)
+            self.breaker.record_success()
+            return result
+
+    async def call_async(self, fn, hedge=True):
+        """Like call, with fn returning a coroutine"""
+        for attempt in self._attempts():
+            started = time.monotonic()
+            try:
+                result = await (self._hedged_async(fn) if hedge else fn())
+            except asyncio.CancelledError:
+                self.breaker.record_ignored()
+                raise
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise
+                await self.async_sleep(delay)
+                continue
+            self.latency.record(time.monotonic() - started)
+            self.breaker.record_success()
+            return result
+
+    def _hedged(self, fn):
+        delay = self.hedge_delay()
+        if delay is None:
+            return fn()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix='hedge')
+        started = threading.Event()
+
+        def primary():
+            started.set()
+            return fn()
+        pending = {self._executor.submit(primary)}
+        # Time spent waiting for a worker is not upstream latency; only hedge
+        # a call that is slow once it is actually running
+        started.wait()
+        done, pending = wait(pending, timeout=delay)
+        if not done:
+            self.hedges += 1
+            pending.add(self._executor.submit(fn))
+        # First success wins; a blocking call cannot be cancelled, so a
+        # losing duplicate simply finishes in the background
+        error = None
+        while done or pending:
+            if not done:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            future = done.pop()
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        raise error
+
+    async def _hedged_async(self, fn):
+        delay = self.hedge_delay()
+        if delay is None:
+            return await fn()
+        pending = {asyncio.ensure_future(fn())}
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            self.hedges += 1
+            pending.add(asyncio.ensure_future(fn()))
+        error = None
+        try:
+            while done or pending:
+                if not done:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                task = done.pop()
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        return {
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            'rejected': self.breaker.rejected,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'hedge_delay': self.hedge_delay()
+        }
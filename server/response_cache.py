@@ -0,0 +1,87 @@
+import hashlib
+import os
+import random
+import re
+import threading
+from cache import TTLCache
+
+_DATE_LINE = re.compile(r'^\s*Date:.*$', re.MULTILINE)
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_email(email_content):
+    """Reduce an email to what matters for the reply.
+
+    Drops the Date: header, which differs on every send, and ignores case
+    and whitespace so trivially re-typed copies of an attack share a key.
+    """
+    email_content = _DATE_LINE.sub('', email_content)
+    return _WHITESPACE.sub(' ', email_content).strip().casefold()
+
+def verdicts(security_results):
+    """The pass/fail outcome of each check, which is all the prompt shows"""
+    return tuple(sorted((key, bool(check['passed'])) for key, check in security_results.items()))
+
+def response_key(level_name, email_content, security_results):
+    """Key shared by every request that would produce the same prompt"""
+    digest = hashlib.sha256()
+    digest.update(level_name.lower().encode())
+    digest.update(b'\0')
+    digest.update(normalize_email(email_content).encode('utf-8', 'surrogatepass'))
+    digest.update(b'\0')
+    digest.update(repr(verdicts(security_results)).encode())
+    return digest.hexdigest()
+
+class ResponseCache:
+    """Cache of character replies keyed on level, email and check verdicts.
+
+    Each key collects up to `variants` distinct replies before it starts
+    serving them; from then on a random one is returned, so players sending
+    the same canned attack do not all see the exact same answer.
+    """
+
+    def __init__(self, max_entries=2048, ttl=3600, variants=1, max_bytes=8 * 1024 * 1024):
+        self.variants = max(1, variants)
+        self._cache = TTLCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return a cached reply, or None while the key still needs variants"""
+        pool = self._cache.get(key, ())
+        with self._lock:
+            if len(pool) < self.variants:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return random.choice(pool)
+
+    def add(self, key, response):
+        pool = self._cache.get(key, ())
+        if len(pool) < self.variants:
+            self._cache.set(key, pool + (response,))
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+        storage = self._cache.stats()
+        stats.update(entries=storage['entries'], size_bytes=storage['size_bytes'], evictions=storage['evictions'])
+        return stats
+
+def create_response_cache():
+    """Build the reply cache from the environment, or None if it is disabled"""
+    if os.getenv("LLM_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    return ResponseCache(
+        max_entries=int(os.getenv("LLM_CACHE_SIZE", "2048")),
+        ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+        variants=int(os.getenv("LLM_CACHE_VARIANTS", "1"))
+    )
@@ -1,114 +1,691 @@
+import collections
+import hashlib
+import itertools
+import os
 import re
+import string
+import threading
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from bktree import BKTree
+from cache import TTLCache
 
 class SecurityCheck:
-    def __init__(self, name, description, check_function):
+    def __init__(self, name, description, check_function, cost=1, decisive=True, cache_key=None):
+        """A single named check run against every incoming email.
+
+        Args:
+            check_function: Called as check_function(checker, from_address,
+                subject, content) and returns a dict with at least 'passed'
+            cost (int): Rough relative cost; cheaper checks run first
+            decisive (bool): Whether a failure of this check settles the
+                overall verdict, allowing the remaining checks to be skipped
+            cache_key: Optional function with the same arguments as
+                check_function returning a key for caching its result
+        """
         self.name = name
         self.description = description
         self.check_function = check_function
+        self.cost = cost
+        self.decisive = decisive
+        self.cache_key = cache_key
+
+# Latin lookalikes that Unicode normalization does not fold to ASCII
+HOMOGLYPHS = {
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'һ': 'h', 'і': 'i', 'ї': 'i', 'ј': 'j',
+    'к': 'k', 'о': 'o', 'р': 'p', 'ԛ': 'q', 'с': 'c', 'ѕ': 's', 'т': 't', 'у': 'y',
+    'ԝ': 'w', 'х': 'x', 'ԁ': 'd', 'ɡ': 'g',
+    'А': 'A', 'В': 'B', 'Е': 'E', 'Ё': 'E', 'Н': 'H', 'І': 'I', 'Ј': 'J', 'К': 'K',
+    'М': 'M', 'О': 'O', 'Р': 'P', 'С': 'C', 'Ѕ': 'S', 'Т': 'T', 'У': 'Y', 'Х': 'X',
+    # Greek
+    'α': 'a', 'ε': 'e', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't',
+    'υ': 'u', 'χ': 'x',
+    'Α': 'A', 'Β': 'B', 'Ε': 'E', 'Ζ': 'Z', 'Η': 'H', 'Ι': 'I', 'Κ': 'K', 'Μ': 'M',
+    'Ν': 'N', 'Ο': 'O', 'Ρ': 'P', 'Τ': 'T', 'Υ': 'Y', 'Χ': 'X',
+    # Latin
+    'ı': 'i', 'ɑ': 'a', 'ℓ': 'l',
+}
+
+# Characters that render as nothing and are stripped outright
+INVISIBLE_CHARACTERS = '\u00ad\u180e\u200b\u200c\u200d\u2060\u2061\u2062\u2063\u2064\ufeff'
+
+# Digits and symbols standing in for letters inside a word ("URG3NT")
+LEET_SUBSTITUTIONS = {'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b', '$': 's', '@': 'a'}
+
+# Codepoint ranges whose compatibility forms fold to a single ASCII
+# character: fullwidth forms, circled letters and mathematical alphanumerics
+_COMPATIBILITY_RANGES = ((0x2000, 0x200a), (0x2460, 0x24ff), (0xff01, 0xff5e), (0x1d400, 0x1d7ff))
+
+def _build_translation_table():
+    table = {}
+    for first, last in _COMPATIBILITY_RANGES:
+        for codepoint in range(first, last + 1):
+            folded = unicodedata.normalize('NFKC', chr(codepoint))
+            if len(folded) == 1 and folded.isascii() and folded.isprintable():
+                table[codepoint] = folded
+    table.update((ord(char), latin) for char, latin in HOMOGLYPHS.items())
+    table.update((ord(char), None) for char in INVISIBLE_CHARACTERS)
+    return table
+
+_TRANSLATION_TABLE = _build_translation_table()
+_LEET_PATTERN = re.compile('[%s]+' % re.escape(''.join(LEET_SUBSTITUTIONS)))
+# '@' separates the parts of an address rather than standing in for a letter
+_ADDRESS_LEET_PATTERN = re.compile('[%s]+' % re.escape(''.join(char for char in LEET_SUBSTITUTIONS if char != '@')))
+# Three or more single letters or digits split by the same kind of filler,
+# as in "u.r.g.e.n.t" or "u r g e n t"
+_LETTER_FILLERS = ' .-_*/|\\,:;~+'
+_SEPARATED_LETTERS = re.compile(r'\b[^\W_](?:[%s]{1,2}[^\W_]){2,}\b' % re.escape(_LETTER_FILLERS))
+_SEPARATORS = re.compile(r'[^\w]|_')
+
+def _undo_leet(match):
+    # Only digits touching a letter stand in for one; "24 hours" stays as is
+    text, start, end = match.string, match.start(), match.end()
+    if (start and text[start - 1].isalpha()) or (end < len(text) and text[end].isalpha()):
+        return ''.join(LEET_SUBSTITUTIONS[char] for char in match.group())
+    return match.group()
+
+def _join_separated(match):
+    # Lowercase so a spelled-out acronym like "U.S.A." does not read as shouting
+    return _SEPARATORS.sub('', match.group()).lower()
+
+def _contains_any(text, characters):
+    # One substring search per character beats a regex scan on clean text
+    return any(char in text for char in characters)
+
+def normalize_text(text):
+    """Undo common obfuscation before matching keywords.
+
+    Folds lookalike and compatibility characters to ASCII and drops
+    invisible ones in a single str.translate pass, joins letters spelled out
+    with separators, and reads digits inside words as the letters they stand
+    in for. Every step is a single linear pass over the text.
+    """
+    if not text.isascii():
+        text = text.translate(_TRANSLATION_TABLE)
+    text = _SEPARATED_LETTERS.sub(_join_separated, text)
+    if _contains_any(text, LEET_SUBSTITUTIONS):
+        text = _LEET_PATTERN.sub(_undo_leet, text)
+    return text
+
+def normalize_address(address):
+    """Reduce an email address to the skeleton it visually resembles"""
+    address = address.strip()
+    if not address.isascii():
+        address = address.translate(_TRANSLATION_TABLE)
+    return _ADDRESS_LEET_PATTERN.sub(_undo_leet, address.lower())
 
 def is_from_supervisor(from_email, supervisor_email):
     return from_email.lower() == supervisor_email.lower()
 
+def is_supervisor_lookalike(from_email, supervisor_email):
+    """True for an address that only looks like the supervisor's"""
+    return (
+        not is_from_supervisor(from_email, supervisor_email)
+        and normalize_address(from_email) == normalize_address(supervisor_email)
+    )
+
+# Keyword patterns, matched case-insensitively. When several keywords match
+# at the same position the longest one is reported.
+URGENT_KEYWORDS = (
+    # Immediate Action Words
+    r'\basap\b', r'\burgent\b', r'\burgently\b', r'\bemergency\b', r'\bcritical\b',
+    r'\bimmediate\b', r'\brush\b', r'\bpriority\b', r'time-sensitive', r'\bdeadline\b',
+    r'\bpressing\b', r'at once', r'right away', r'on the double',
+
+    # Time-Related Phrases
+    r'as soon as possible', r'need this immediately', r'by end of day',
+    r'without delay', r'time is running out', r'running out of time',
+    r'cannot wait', r'due immediately', r'requires immediate attention',
+    r'quick response needed', r'with no hesitation', r'at the earliest',
+    r'in a jiffy', r'do it now', r'no delay',
+
+    # Deadline Indicators
+    r'due by', r'must be completed by', r'deadline approaching', r'final notice',
+    r'last chance', r'cutoff time', r'time-bound', r'expires soon',
+    r'closing soon', r'terminal date',
+
+    # Action-Required Terms
+    r'action required', r'response needed', r'please respond',
+    r'immediate response required', r'quick turnaround', r'fast-track',
+    r'\bexpedite\b', r'\baccelerate\b', r'speed up', r'\bescalate\b',
+
+    # Time Frame Specifiers
+    r'today only', r'within 24 hours', r'by tomorrow', r'this morning',
+    r'this afternoon', r'before cob', r'before close', r'first thing',
+    r'next hour', r'immediately following', r'within the hour',
+
+    # Emergency Indicators
+    r'red flag', r'high priority', r'top priority', r'code red',
+    r'\balert\b', r'\bwarning\b', r'\bcrisis\b', r'\bbreaking\b',
+    r'\bsos\b', r'time-critical', r'high importance',
+
+    # Consequence Indicators
+    r'or else', r'\botherwise\b', r'if not', r'missing deadline',
+    r'past due', r'\boverdue\b', r'late notice', r'final warning',
+    r'last reminder', r'non-negotiable',
+
+    # Business Impact Terms
+    r'business critical', r'mission critical', r'\bvital\b', r'\bessential\b',
+    r'\bcrucial\b', r'\bimportant\b', r'\bsignificant\b', r'\bkey\b',
+    r'\bcore\b', r'\bfundamental\b',
+
+    # Follow-up Pressure
+    r'following up', r'second request', r'third reminder', r'still waiting',
+    r"haven't heard back", r'pending response', r'awaiting reply',
+    r'\boutstanding\b', r'\bunresolved\b', r'in queue',
+
+    # Temporal Adverbs
+    r'\bpromptly\b', r'\binstantly\b', r'\bshortly\b', r'\brapidly\b',
+    r'\bswiftly\b', r'\bquickly\b', r'\bhastily\b', r'\bspeedily\b',
+    r'\bimmediately\b', r'\bstraightaway\b', r'\binstant\b', r'\brapid\b',
+    r'\bhurry\b', r'\bswift\b', r'\bmomentary\b', r'\bflash\b', r'\bsnap\b',
+
+    # System/Disaster Related
+    r'\bdisaster\b', r'\brecovery mode\b', r'\boverwrite\b', r'\bfalse alarm\b',
+    r'\btrigger(?:ed)?\b', r'\bdata loss\b', r'\bsystem (?:down|issue|problem)\b',
+
+    # Threat Related
+    r'should fire you', r'fire you', r'will fire', r'get fired',
+
+    # Additional Context
+    r'!!+',  # Multiple exclamation marks
+)
+
+# Three or more consecutive capital letters (shouting). This rule is matched
+# against the original text, since it can never fire on lowercased input.
+SHOUTING_PATTERN = r'[A-Z]{3,}'
+
+# Common acronyms that are written in capitals without any urgency intended
+SHOUTING_EXEMPT = frozenset({
+    'FYI', 'CEO', 'CTO', 'CFO', 'COO', 'VPN', 'SQL', 'API', 'URL', 'PDF', 'FAQ',
+})
+
+_PATTERN_GROUP = re.compile(r'\(\?:([^()]*)\)(\?)?')
+_REGEX_METACHARACTERS = frozenset('\\.^$*+?{}[]|()')
+
+def _expand_pattern(pattern):
+    """Expand (?:a|b) and (?:a)? groups into every string they can match"""
+    group = _PATTERN_GROUP.search(pattern)
+    if not group:
+        return [pattern]
+    alternatives = group.group(1).split('|') + ([''] if group.group(2) else [])
+    expanded = []
+    for alternative in alternatives:
+        expanded.extend(_expand_pattern(pattern[:group.start()] + alternative + pattern[group.end():]))
+    return expanded
+
+def _trie_regex(words):
+    """Build a regex matching any of words, factored on common prefixes.
+
+    words maps each literal to whether it must end on a word boundary.
+    Longer continuations are tried first so the longest keyword wins.
+    """
+    trie = {}
+    for word, boundary in words.items():
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = boundary
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if '' in node:
+            branches.append(r'\b' if node[''] else '')
+        return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+
+    return emit(trie)
+
+class _UrgencyMatcher:
+    """All urgency patterns compiled into one scan plus a shouting scan.
+
+    Literal keywords are merged into prefix tries, so each position in the
+    text costs a single branch walk instead of one attempt per keyword. The
+    trie runs case-sensitively over lowercased text, which is several times
+    faster than re.IGNORECASE; the shouting rule runs over the original.
+    """
+
+    def __init__(self, keywords):
+        self.labels = {}
+        self.max_literal_length = 0
+        bounded, unbounded, specials = {}, {}, []
+        for pattern in keywords:
+            leading = pattern.startswith(r'\b')
+            body = pattern[2:] if leading else pattern
+            trailing = body.endswith(r'\b')
+            body = body[:-2] if trailing else body
+            literals = _expand_pattern(body)
+            if any(_REGEX_METACHARACTERS.intersection(literal) for literal in literals):
+                specials.append(pattern)
+                continue
+            target = bounded if leading else unbounded
+            self.max_literal_length = max([self.max_literal_length] + [len(literal) for literal in literals])
+            for literal in literals:
+                target.setdefault(literal, trailing)
+                self.labels.setdefault(literal, pattern)
+
+        branches = []
+        if bounded:
+            branches.append(r'\b' + _trie_regex(bounded))
+        if unbounded:
+            branches.append(_trie_regex(unbounded))
+        self.special_groups = {}
+        for index, pattern in enumerate(specials):
+            branches.append(f'(?P<special{index}>{pattern})')
+            self.special_groups[f'special{index}'] = pattern
+        source = '|'.join(branches)
+        self.keywords = re.compile(source)
+        # Lowercasing a few non-ASCII characters changes the string length,
+        # which would shift every offset after them
+        self.keywords_ignorecase = re.compile(source, re.IGNORECASE)
+        self.shouting = re.compile(SHOUTING_PATTERN)
+
+    def _label(self, matched):
+        keyword = self.labels.get(matched.lower())
+        if keyword is None:
+            # Only reachable through the IGNORECASE fallback, where Unicode
+            # case folding can match letters that lower() leaves alone
+            keyword = next(
+                (pattern for pattern in self.labels.values() if re.fullmatch(pattern, matched, re.IGNORECASE)),
+                matched
+            )
+        return keyword
+
+    def finditer(self, text):
+        """Yield (keyword, start, end) for every match, ordered by position"""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            found = self.keywords.finditer(lowered)
+        else:
+            found = self.keywords_ignorecase.finditer(text)
+        keyword_spans = []
+        for match in found:
+            if match.lastgroup:
+                keyword = self.special_groups[match.lastgroup]
+            else:
+                keyword = self._label(match.group())
+            keyword_spans.append((keyword, match.start(), match.end()))
+
+        shouting_spans = [
+            (SHOUTING_PATTERN, match.start(), match.end())
+            for match in self.shouting.finditer(text)
+            if match.group() not in SHOUTING_EXEMPT
+        ]
+        if not shouting_spans:
+            yield from keyword_spans
+            return
+
+        # Shouting only counts where no keyword already matched
+        index = 0
+        for span in shouting_spans:
+            while index < len(keyword_spans) and keyword_spans[index][2] <= span[1]:
+                yield keyword_spans[index]
+                index += 1
+            if index < len(keyword_spans) and keyword_spans[index][1] < span[2]:
+                continue
+            yield span
+        yield from keyword_spans[index:]
+
+_URGENCY_MATCHER = _UrgencyMatcher(URGENT_KEYWORDS)
+
+def find_urgent_keywords(text):
+    """Scan text once and return every urgency match.
+
+    Returns:
+        list: One dict per match with the matching 'keyword' pattern, the
+        matched 'text' and its 'start'/'end' offsets in the input.
+    """
+    return [
+        {'keyword': keyword, 'text': text[start:end], 'start': start, 'end': end}
+        for keyword, start, end in _URGENCY_MATCHER.finditer(text)
+    ]
+
+# Texts longer than this are normalized and scanned in chunks, so a verdict
+# can be reached without normalizing and scanning the whole thing. Kept well
+# below MAX_EMAIL_BODY_CHARS so that long bodies do take this path.
+STREAM_CHUNK_SIZE = 8 * 1024
+
+# ASCII characters that no normalization step reads across: not part of a
+# word, not a filler between spelled-out letters and not a leet stand-in.
+# Text cut just after one normalizes the same piece by piece as in one go.
+_CHUNK_BOUNDARY = re.compile('[%s]' % re.escape(''.join(
+    char for char in string.whitespace + string.punctuation
+    if char not in _LETTER_FILLERS and char not in LEET_SUBSTITUTIONS and char != '_'
+)))
+
+def _normalized_chunks(text, chunk_size):
+    """Yield normalize_text(text) in pieces of about chunk_size characters.
+
+    Each piece ends just after a chunk boundary character, so the pieces
+    join up to exactly normalize_text(text). A stretch with no boundary for
+    another chunk_size characters is cut where it is.
+    """
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end < len(text):
+            boundary = _CHUNK_BOUNDARY.search(text, end - 1, end + chunk_size)
+            end = boundary.end() if boundary else end
+        yield normalize_text(text[start:end])
+        start = end
+
+def _scan_chunks(chunks):
+    """Yield urgency matches in text arriving as consecutive chunks.
+
+    Each chunk is scanned with one character of context before it and
+    enough of the next chunk to complete any keyword starting inside it, so
+    phrases and word boundaries that straddle a chunk edge are still
+    handled. Only matches starting inside the chunk itself are reported,
+    which keeps each match from being reported twice.
+    """
+    lookahead = _URGENCY_MATCHER.max_literal_length + 1
+    chunks = iter(chunks)
+    pending = collections.deque()
+    before, offset = '', 0
+    while True:
+        # Read ahead until the oldest chunk has enough text after it
+        while not pending or sum(map(len, itertools.islice(pending, 1, None))) < lookahead:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            pending.append(chunk)
+        if not pending:
+            return
+        current = pending.popleft()
+        window = before + current + ''.join(pending)[:lookahead]
+        for keyword, start, end in _URGENCY_MATCHER.finditer(window):
+            if len(before) <= start < len(before) + len(current):
+                yield {'keyword': keyword, 'text': window[start:end],
+                       'start': offset + start - len(before), 'end': offset + end - len(before)}
+        offset += len(current)
+        before = current[-1:]
+
+def iter_urgent_keywords(text, chunk_size=STREAM_CHUNK_SIZE, normalize=False):
+    """Lazily yield urgency matches, scanning text one chunk at a time.
+
+    With normalize, each chunk is normalized just before it is scanned and
+    offsets refer to normalize_text(text). Stop iterating to stop scanning.
+    """
+    if normalize:
+        chunks = _normalized_chunks(text, chunk_size)
+    else:
+        chunks = (text[start:start + chunk_size] for start in range(0, len(text), chunk_size))
+    return _scan_chunks(chunks)
+
 def contains_urgent_keywords(text):
-    urgent_keywords = {
-        # Immediate Action Words
-        r'\basap\b', r'\burgent\b', r'\burgently\b', r'\bemergency\b', r'\bcritical\b',
-        r'\bimmediate\b', r'\brush\b', r'\bpriority\b', r'time-sensitive', r'\bdeadline\b',
-        r'\bpressing\b', r'at once', r'right away', r'on the double',
-
-        # Time-Related Phrases
-        r'as soon as possible', r'need this immediately', r'by end of day',
-        r'without delay', r'time is running out', r'running out of time',
-        r'cannot wait', r'due immediately', r'requires immediate attention',
-        r'quick response needed', r'with no hesitation', r'at the earliest',
-        r'in a jiffy', r'do it now', r'no delay',
-
-        # Deadline Indicators
-        r'due by', r'must be completed by', r'deadline approaching', r'final notice',
-        r'last chance', r'cutoff time', r'time-bound', r'expires soon',
-        r'closing soon', r'terminal date',
-
-        # Action-Required Terms
-        r'action required', r'response needed', r'please respond',
-        r'immediate response required', r'quick turnaround', r'fast-track',
-        r'\bexpedite\b', r'\baccelerate\b', r'speed up', r'\bescalate\b',
-
-        # Time Frame Specifiers
-        r'today only', r'within 24 hours', r'by tomorrow', r'this morning',
-        r'this afternoon', r'before cob', r'before close', r'first thing',
-        r'next hour', r'immediately following', r'within the hour',
-
-        # Emergency Indicators
-        r'red flag', r'high priority', r'top priority', r'code red',
-        r'\balert\b', r'\bwarning\b', r'\bcrisis\b', r'\bbreaking\b',
-        r'\bsos\b', r'time-critical', r'high importance',
-
-        # Consequence Indicators
-        r'or else', r'\botherwise\b', r'if not', r'missing deadline',
-        r'past due', r'\boverdue\b', r'late notice', r'final warning',
-        r'last reminder', r'non-negotiable',
-
-        # Business Impact Terms
-        r'business critical', r'mission critical', r'\bvital\b', r'\bessential\b',
-        r'\bcrucial\b', r'\bimportant\b', r'\bsignificant\b', r'\bkey\b',
-        r'\bcore\b', r'\bfundamental\b',
-
-        # Follow-up Pressure
-        r'following up', r'second request', r'third reminder', r'still waiting',
-        r"haven't heard back", r'pending response', r'awaiting reply',
-        r'\boutstanding\b', r'\bunresolved\b', r'in queue',
-
-        # Temporal Adverbs
-        r'\bpromptly\b', r'\binstantly\b', r'\bshortly\b', r'\brapidly\b',
-        r'\bswiftly\b', r'\bquickly\b', r'\bhastily\b', r'\bspeedily\b',
-        r'\bimmediately\b', r'\bstraightaway\b', r'\binstant\b', r'\brapid\b',
-        r'\bhurry\b', r'\bswift\b', r'\bmomentary\b', r'\bflash\b', r'\bsnap\b',
-
-        # System/Disaster Related
-        r'\bdisaster\b', r'\brecovery mode\b', r'\boverwrite\b', r'\bfalse alarm\b',
-        r'\btrigger(?:ed)?\b', r'\bdata loss\b', r'\bsystem (?:down|issue|problem)\b',
-
-        # Threat Related
-        r'should fire you', r'fire you', r'will fire', r'get fired',
-
-        # Additional Context
-        r'!!+',  # Multiple exclamation marks
-        r'[A-Z]{3,}',  # Three or more consecutive capital letters
+    return next(iter_urgent_keywords(text, normalize=True), None) is not None
+
+def _find_urgency_spans(subject, content, stop_at_first=False):
+    """Scan subject and body in one pass, reporting spans per field.
+
+    Both are normalized first, so spans refer to the normalized text. When
+    stopping at the first match the body is normalized chunk by chunk, and
+    only as far as the scan gets.
+    """
+    subject = normalize_text(subject)
+    body_offset = len(subject) + 1
+    if stop_at_first:
+        chunks = itertools.chain([subject + " "], _normalized_chunks(content, STREAM_CHUNK_SIZE))
+        first = next(_scan_chunks(chunks), None)
+        found = [first] if first else []
+    else:
+        found = find_urgent_keywords(subject + " " + normalize_text(content))
+    spans = []
+    for match in found:
+        if match['start'] < body_offset:
+            match['field'] = 'subject'
+        else:
+            match['field'] = 'body'
+            match['start'] -= body_offset
+            match['end'] -= body_offset
+        spans.append(match)
+    return spans
+
+# Largest edit distance at which a sender counts as imitating a colleague
+LOOKALIKE_MAX_DISTANCE = 2
+
+@lru_cache(maxsize=64)
+def _directory_index(directory):
+    """Index a level's directory by address skeleton, built once per directory"""
+    skeletons = {}
+    for address in directory:
+        skeletons.setdefault(normalize_address(address), []).append(address)
+    return BKTree(skeletons), skeletons
+
+def find_lookalike_colleagues(from_address, directory, max_distance=LOOKALIKE_MAX_DISTANCE):
+    """Return the directory addresses that from_address imitates.
+
+    Args:
+        directory (tuple): Sorted, lowercased addresses of known colleagues
+
+    Returns:
+        list: Dicts with the imitated 'email' and the edit 'distance' between
+        the skeletons, closest first. Empty when the sender is itself a
+        known colleague.
+    """
+    sender = from_address.strip().lower()
+    if not directory or sender in directory:
+        return []
+    tree, skeletons = _directory_index(directory)
+    return [
+        {'email': address, 'distance': distance}
+        for distance, skeleton in tree.search(normalize_address(sender), max_distance)
+        for address in skeletons[skeleton]
+    ]
+
+def _check_lookalike_sender(checker, from_address, subject, content):
+    matches = find_lookalike_colleagues(from_address, checker.directory)
+    return {'passed': not matches, 'matches': matches}
+
+def _lookalike_cache_key(checker, from_address, subject, content):
+    return ('lookalike_sender', checker.directory_key, from_address.strip().lower())
+
+def _check_from_supervisor(checker, from_address, subject, content):
+    return {
+        'passed': is_from_supervisor(from_address, checker.supervisor_email),
+        'lookalike': is_supervisor_lookalike(from_address, checker.supervisor_email)
     }
-    text_lower = text.lower()
-    return any(re.search(pattern, text_lower) for pattern in urgent_keywords)
+
+def _streams_urgency(checker, subject, content):
+    # Long emails stop at the first match; that is enough for the verdict
+    return checker.stream_threshold is not None and len(subject) + len(content) > checker.stream_threshold
+
+def _check_urgency(checker, from_address, subject, content):
+    matches = _find_urgency_spans(subject, content, stop_at_first=_streams_urgency(checker, subject, content))
+    return {'passed': bool(matches), 'matches': matches}
+
+def _supervisor_cache_key(checker, from_address, subject, content):
+    # The verdict depends only on the level's supervisor and the sender
+    return ('from_supervisor', checker.supervisor_email.lower(), from_address.lower())
+
+def _urgency_cache_key(checker, from_address, subject, content):
+    # Keyed on the raw text, so a lookup costs a hash and never a
+    # normalization pass; whether only the first match is kept is part of it
+    stream = _streams_urgency(checker, subject, content)
+    # Trailing whitespace never affects a match or its offsets
+    digest = hashlib.sha256(f"{subject}\0{content.rstrip()}".encode('utf-8', 'surrogatepass'))
+    return ('urgency', stream, digest.hexdigest())
+
+class SecurityCheckRegistry:
+    """Named security checks, run cheapest first with per-check timing"""
+
+    def __init__(self, cache=None):
+        self.checks = {}
+        self.cache = cache
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def register(self, key, check):
+        self.checks[key] = check
+
+    def ordered(self, keys):
+        """Return (key, check) pairs for the given keys, cheapest first"""
+        unknown = [key for key in keys if key not in self.checks]
+        if unknown:
+            raise ValueError(f"Unknown security checks: {', '.join(unknown)}")
+        return sorted(((key, self.checks[key]) for key in keys), key=lambda item: item[1].cost)
+
+    def run(self, checker, keys, from_address, subject, content, short_circuit=False):
+        """Run the given checks against an email.
+
+        With short_circuit set, the first failing decisive check settles the
+        verdict and the remaining checks are reported as skipped failures.
+        """
+        results = {}
+        decided = False
+        for key, check in self.ordered(keys):
+            result = {'name': check.name, 'description': check.description}
+            if decided:
+                result.update({'passed': False, 'skipped': True})
+            else:
+                result.update(self._run_check(key, check, checker, from_address, subject, content))
+                decided = short_circuit and check.decisive and not result['passed']
+            results[key] = result
+        return results
+
+    def _run_check(self, key, check, checker, from_address, subject, content):
+        cache_key = None
+        if self.cache is not None and check.cache_key is not None:
+            cache_key = check.cache_key(checker, from_address, subject, content)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        started = time.perf_counter()
+        result = check.check_function(checker, from_address, subject, content)
+        self._record_timing(key, time.perf_counter() - started)
+        if cache_key is not None:
+            self.cache.set(cache_key, result)
+        return result
+
+    def _record_timing(self, key, elapsed):
+        with self._lock:
+            timing = self._timings.setdefault(key, {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            timing['calls'] += 1
+            timing['total_seconds'] += elapsed
+            timing['max_seconds'] = max(timing['max_seconds'], elapsed)
+
+    def get_timings(self):
+        """Return a snapshot of wall time spent in each check"""
+        with self._lock:
+            return {
+                key: dict(timing, mean_seconds=timing['total_seconds'] / timing['calls'])
+                for key, timing in self._timings.items()
+            }
+
+    def reset_timings(self):
+        with self._lock:
+            self._timings.clear()
+
+def _create_result_cache():
+    """Build the check result cache from the environment.
+
+    The default 16 MiB budget keeps the cache well inside the backend pod's
+    256Mi memory limit; SECURITY_CHECK_CACHE_ENTRIES=0 disables it.
+    """
+    max_entries = int(os.getenv("SECURITY_CHECK_CACHE_ENTRIES", "10000"))
+    if max_entries <= 0:
+        return None
+    return TTLCache(
+        max_entries=max_entries,
+        max_bytes=int(os.getenv("SECURITY_CHECK_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+        ttl=float(os.getenv("SECURITY_CHECK_CACHE_TTL", "3600"))
+    )
+
+security_check_registry = SecurityCheckRegistry(cache=_create_result_cache())
+security_check_registry.register('from_supervisor', SecurityCheck(
+    'Supervisor Check',
+    'Checks if the email is from your supervisor',
+    _check_from_supervisor,
+    cost=1,
+    cache_key=_supervisor_cache_key
+))
+security_check_registry.register('lookalike_sender', SecurityCheck(
+    'Lookalike Sender Check',
+    "Checks that the sender is not imitating a known colleague's address",
+    _check_lookalike_sender,
+    cost=5,
+    cache_key=_lookalike_cache_key
+))
+security_check_registry.register('urgency', SecurityCheck(
+    'Urgency Check',
+    'Checks for urgent or time-pressuring language',
+    _check_urgency,
+    cost=10,
+    cache_key=_urgency_cache_key
+))
+
+# Checks run for levels that do not declare their own
+DEFAULT_SECURITY_CHECKS = ('from_supervisor', 'lookalike_sender', 'urgency')
+
+# Batches below this size are never worth shipping to a process pool
+PARALLEL_BATCH_THRESHOLD = 1000
 
 class SecurityChecker:
-    def __init__(self, supervisor_email):
+    def __init__(self, supervisor_email, checks=None, short_circuit=False,
+                 stream_threshold=STREAM_CHUNK_SIZE, colleagues=()):
         self.supervisor_email = supervisor_email
-    
+        # The supervisor is always part of the directory senders are compared to
+        self.directory = tuple(sorted({
+            address.strip().lower() for address in (supervisor_email, *colleagues) if address
+        }))
+        self.directory_key = hashlib.sha256("\n".join(self.directory).encode()).hexdigest()[:16]
+        self.checks = tuple(checks or DEFAULT_SECURITY_CHECKS)
+        self.short_circuit = short_circuit
+        # Emails longer than this only report their first urgency match
+        self.stream_threshold = stream_threshold
+        # Fail at construction rather than on the first email
+        security_check_registry.ordered(self.checks)
+
     def analyze_email(self, from_address, subject, content):
         """Analyze an email for security risks"""
-        checks = {
-            'from_supervisor': {
-                'passed': is_from_supervisor(from_address, self.supervisor_email),
-                'name': 'Supervisor Check',
-                'description': 'Checks if the email is from your supervisor'
-            },
-            'urgency': {
-                'passed': contains_urgent_keywords(subject + " " + content),
-                'name': 'Urgency Check',
-                'description': 'Checks for urgent or time-pressuring language'
-            }
-        }
-        return checks
-
-def perform_security_checks(email_data, supervisor_email):
-    checker = SecurityChecker(supervisor_email)
-    return checker.analyze_email(
-        email_data['from_address'],
-        email_data['subject'],
-        email_data['body']
-    )
+        return security_check_registry.run(
+            self, self.checks, from_address, subject, content,
+            short_circuit=self.short_circuit
+        )
+
+    def analyze_batch(self, emails, workers=None, chunk_size=256,
+                      min_parallel=PARALLEL_BATCH_THRESHOLD):
+        """Analyze many emails, returning results in input order.
+
+        Args:
+            emails: Iterable of dicts with 'from_address', 'subject' and 'body'
+            workers (int): Spread the work over this many processes. Batches
+                smaller than min_parallel are always checked in-process, since
+                starting a pool costs more than it saves there.
+            chunk_size (int): Number of emails handed to a worker at a time
+        """
+        emails = list(emails)
+        if workers and workers > 1 and len(emails) >= min_parallel:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(self.analyze_email_data, emails, chunksize=chunk_size))
+        return [self.analyze_email_data(email) for email in emails]
+
+    def analyze_email_data(self, email_data):
+        return self.analyze_email(
+            email_data['from_address'],
+            email_data['subject'],
+            email_data['body']
+        )
+
+def perform_security_checks(email_data, supervisor_email, checks=None, colleagues=(), short_circuit=False):
+    checker = SecurityChecker(supervisor_email, checks, short_circuit=short_circuit, colleagues=colleagues)
+    return checker.analyze_email_data(email_data)
+
+def perform_security_checks_batch(emails, supervisor_email, workers=None, chunk_size=256, checks=None,
+                                  colleagues=()):
+    """Run the security checks over a list of emails, keeping input order"""
+    checker = SecurityChecker(supervisor_email, checks, colleagues=colleagues)
+    return checker.analyze_batch(emails, workers=workers, chunk_size=chunk_size)
 
 def format_security_results(results):
     formatted = []
     for check_name, check in results.items():
-        status = "✅ Passed" if check['passed'] else "❌ Failed"
+        if check.get('skipped'):
+            # Not run: an earlier check already settled the verdict
+            status = "⏭️ Skipped"
+        else:
+            status = "✅ Passed" if check['passed'] else "❌ Failed"
         formatted.append(f"{check['name']}: {status}")
     return "\n".join(formatted)
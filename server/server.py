@@ -1,16 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from janet import janet
+from werkzeug.exceptions import HTTPException
 import os
-from security_checks import perform_security_checks
-from telegram_bot import send_message, format_game_message
-from datetime import datetime
-from game import get_janet_response
-from levels import game_levels
-from character import Character
+from notifications import notify
+from rate_limit_alerts import rate_limit_alerts
+from game import (backend, format_sse, format_server_timing, get_janet_response, stream_janet_response,
+                  get_llm_stats, get_readiness, timed)
+from admission import Overloaded
+from warmup import warmup
+from config import MAX_REQUEST_BYTES
+import api
 import argparse
+import itertools
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -19,6 +22,10 @@ CORS(app)
 # Configure testing mode
 app.config['TESTING'] = os.environ.get('FLASK_TESTING', 'False').lower() == 'true'
 
+# Reject oversized requests before they are parsed, and oversized email
+# bodies and subjects before they reach the security checks and the prompt
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
 # Initialize rate limiter
 limiter = Limiter(
     get_remote_address,
@@ -33,145 +40,159 @@ def ratelimit_handler(e):
     # Get the current limit that was exceeded
     limit = getattr(e, 'description', 'Rate limit exceeded')
     
-    # Send notification via Telegram
-    send_message(format_game_message(
-        "RATE_LIMIT",
-        f"Rate limit exceeded: {limit}\nIP: {get_remote_address()}"
-    ))
+    # Counted here, reported in a periodic summary
+    rate_limit_alerts.record(get_remote_address(), limit)
     
     return jsonify({
         "error": "Too many requests",
         "description": limit
     }), 429
 
+def json_response(status_payload):
+    status, payload = status_payload
+    return jsonify(payload), status
+
+@app.errorhandler(413)  # HTTP 413 Payload Too Large, from MAX_CONTENT_LENGTH
+def payload_too_large_handler(e):
+    return json_response(api.request_too_large())
+
+@app.after_request
+def add_server_timing(response):
+    # Per-stage durations, for load tests and the browser's network panel
+    if g.get('stages'):
+        response.headers['Server-Timing'] = format_server_timing(g.stages)
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
+    """Liveness: the process is up and serving requests"""
     return jsonify({"status": "healthy"}), 200
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: whether to route new traffic here (not while overloaded or upstream is down)"""
+    reasons = get_readiness()
+    if reasons:
+        return jsonify({"status": "not_ready", "reasons": reasons}), 503
+    return jsonify({"status": "ready"}), 200
+
+def overloaded_response(e):
+    return jsonify(api.overloaded_data(e)), 503, {'Retry-After': str(e.retry_after)}
+
+def receive_email(data):
+    """Validate a send_email payload and run the security checks on it (see api.receive_email)"""
+    error, email_round = api.receive_email(data, g.setdefault('stages', []))
+    return (json_response(error) if error else None), email_round
+
+def game_round_data(email_round, response):
+    """Report the round to the notification sinks and build the player's response payload"""
+    notify("GAME_ROUND", api.game_round_message(email_round, response))
+    return api.response_data(email_round, response)
+
+def report_error(e):
+    notify("ERROR", api.error_message(e))
+
+@app.route('/api/stats', methods=['GET'])
+def llm_stats():
+    return jsonify(get_llm_stats()), 200
+
 @app.route('/api/send_email', methods=['POST'])
 @limiter.limit("1000 per day")
 @limiter.limit("1 per second")
 def send_email():
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-
-        # Get debug mode and target character from request parameters
-        debug = data.get('debug', False)
-        target_character = data.get('target_character', 'janet')
-        
-        # Get the target level and create a character instance
-        level = game_levels.get_level(target_character)
-        if not level:
-            return jsonify({"error": f"Character '{target_character}' not found"}), 404
-            
-        character = Character(level.character)
-        
-        # Extract email data
-        from_address = data.get('from')
-        subject = data.get('subject')
-        body = data.get('body')
-        
-        if not all([from_address, subject, body]):
-            return jsonify({"error": "Missing required fields"}), 400
-            
-        # Format the email content
-        email_content = f"""
-From: {from_address}
-To: {character.email}
-Subject: {subject}
-Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-{body}
-"""
-        # Log the email details for debugging
-        print(f"\nReceived email:\n{email_content}")
-        
-        # Perform security checks
-        janet_security_checks = perform_security_checks({
-            'from_address': from_address,
-            'subject': subject,
-            'body': body
-        }, character.supervisor_email)
+        error, email_round = receive_email(request.get_json())
+        if error:
+            return error
         
         try:
-            # Get Janet's response with the security checks
-            response = get_janet_response(email_content, janet_security_checks)
+            # Get the character's response with the security checks
+            with timed(g.stages, 'llm'):
+                response = get_janet_response(
+                    email_round['email_content'], email_round['security_checks'], email_round['level'].name
+                )
+        except Overloaded as e:
+            return overloaded_response(e)
         except Exception as e:
-            # Return a character-specific OOO message
-            ooo_response = {
-                'response': character.get_ooo_message(),
-                'success': False
-            }
-            if debug:
-                ooo_response['debugInfo'] = {
-                    'error': str(e),
-                    'email': email_content
-                }
-            return jsonify(ooo_response)
-
-        # Send a single well-formatted message to Telegram
-        game_round_message = f"""Player's Email:
-{email_content}
-
-{character.name}'s Response:
-{response['response']}
-
-Security Checks:
-{janet_security_checks}"""
-
-        send_message(format_game_message("GAME_ROUND", game_round_message))
-                
-        # Return response with debug info only if requested
-        response_data = {
-            'response': response['response'],
-            'success': False
-        } if not debug else {
-            'response': response['response'],
-            'success': False,
-            'securityChecks': janet_security_checks,
-            'debugInfo': {
-                'email': email_content,
-                'system_prompt': response['system_prompt'],
-                'raw_input': response['raw_input']
-            }
-        }
+            return jsonify(api.ooo_response_data(email_round, e))
+
+        with timed(g.stages, 'notify'):
+            response_data = game_round_data(email_round, response)
         
         # Log the response for debugging
         app.logger.info(f"Sending response: {response_data}")
         
         return jsonify(response_data)
+    except HTTPException:
+        raise
     except Exception as e:
-        app.logger.error(f"Error processing request: {str(e)}", exc_info=True)
-        send_message(format_game_message(
-            "ERROR",
-            f"An error occurred: {str(e)}"
-        ))
-        return jsonify({'error': str(e), 'traceback': str(e.__traceback__)}), 500
+        report_error(e)
+        return jsonify(api.error_data(e)), 500
+
+@app.route('/api/send_email/stream', methods=['POST'])
+@limiter.limit("1000 per day")
+@limiter.limit("1 per second")
+def send_email_stream():
+    """Same as send_email, but streams the reply as server-sent events.
+
+    Each "token" event carries a piece of the reply as it is generated; the
+    final "done" event carries the same payload /api/send_email returns.
+    """
+    try:
+        error, email_round = receive_email(request.get_json())
+        if error:
+            return error
+    except HTTPException:
+        raise
+    except Exception as e:
+        report_error(e)
+        return jsonify(api.error_data(e)), 500
+
+    replies = stream_janet_response(
+        email_round['email_content'], email_round['security_checks'], email_round['level'].name
+    )
+    failure = None
+    try:
+        # Wait for the first event before answering, so an overloaded
+        # server can still say 503 instead of starting the stream
+        first = [next(replies)]
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        first, failure = [], e
+
+    def events():
+        if failure:
+            yield format_sse('done', api.ooo_response_data(email_round, failure))
+            return
+        try:
+            for event, payload in itertools.chain(first, replies):
+                if event == 'token':
+                    yield format_sse('token', {'text': payload})
+                else:
+                    response = payload
+        except Exception as e:
+            yield format_sse('done', api.ooo_response_data(email_round, e))
+            return
+        try:
+            yield format_sse('done', game_round_data(email_round, response))
+        except Exception as e:
+            report_error(e)
+            yield format_sse('error', {'error': str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Keep reverse proxies from buffering the stream
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/api/level/<level_name>', methods=['GET'])
 def get_level_info(level_name):
-    level = game_levels.get_level(level_name)
-    if not level:
-        return jsonify({"error": "Level not found"}), 404
-        
-    return jsonify({
-        "objective": level.objective,
-        "character": level.character,
-        "tips": ["Be careful with sensitive information", "Pay attention to the sender's email"]
-    })
+    return json_response(api.level_data(level_name))
 
 @app.route('/api/levels', methods=['GET'])
 def get_available_levels():
-    return jsonify({
-        "levels": [{
-            "id": level.name,
-            "name": level.name,
-            "description": level.objective,
-            "difficulty": "easy"
-        } for level in game_levels.levels.values()]
-    })
+    return jsonify(api.levels_data())
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Start the server')
@@ -198,4 +219,6 @@ if __name__ == '__main__':
         print(f"No port specified via --port argument or PORT environment variable. Using default port {port}")
     
     print(f"Starting server on port {port}")
+    # With WARMUP=true, /api/ready reports warming_up until this is done
+    warmup.start(backend)
     app.run(host='0.0.0.0', port=port)
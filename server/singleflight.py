@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait for it and share its result or exception.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return _stats(len(self._calls), self.leaders, self.coalesced)
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight.
+
+    The shared call runs as its own task, so a leader whose request is
+    cancelled (say, the player closed the tab) does not cancel it for the
+    requests waiting on the same result.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the exception as retrieved when every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return _stats(len(self._tasks), self.leaders, self.coalesced)
+
+def _stats(in_flight, leaders, coalesced):
+    calls = leaders + coalesced
+    return {
+        'in_flight': in_flight,
+        'upstream_calls': leaders,
+        'coalesced': coalesced,
+        'coalesce_rate': coalesced / calls if calls else 0.0
+    }
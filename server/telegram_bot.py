@@ -1,34 +1,85 @@
 import os
-from telegram import Bot
-from telegram.error import TelegramError
+import threading
+from collections import deque
 import asyncio
-from functools import wraps
-from config import load_env
+import time
+from clients import lazy
+from config import load_env  # This will automatically load the environment variables
 from datetime import datetime
 
-load_env()
-
 TELEGRAM_BOT_TOKEN = os.getenv("JANET_SEG_BOT_TOKEN")
 CHAT_ID = os.getenv("JANET_SEG_BOT_CHAT_ID")
 
-if not TELEGRAM_BOT_TOKEN or not CHAT_ID:
-    raise ValueError("Missing required environment variables: JANET_SEG_BOT_TOKEN or JANET_SEG_BOT_CHAT_ID")
+def telegram_configured():
+    return bool(TELEGRAM_BOT_TOKEN and CHAT_ID)
 
-bot = Bot(token=TELEGRAM_BOT_TOKEN)
+def _create_bot():
+    from telegram import Bot
+    return Bot(token=TELEGRAM_BOT_TOKEN)
 
-def async_to_sync(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        return loop.run_until_complete(func(*args, **kwargs))
-    return wrapper
-
-@async_to_sync
-async def send_message(message: str) -> bool:
+# Built on first delivery (see clients.py); None without credentials,
+# and notifications.py then leaves Telegram out
+bot = lazy('telegram', _create_bot) if telegram_configured() else None
+
+# Messages waiting for the background sender; when full, the oldest is dropped
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "1000"))
+
+# Messages queued within this many seconds of each other go out together
+TELEGRAM_BATCH_WINDOW = float(os.getenv("TELEGRAM_BATCH_WINDOW", "1.0"))
+
+# Telegram allows about one message per second in a chat
+TELEGRAM_MIN_INTERVAL = float(os.getenv("TELEGRAM_MIN_INTERVAL", "1.0"))
+
+# Longest text Telegram accepts in one message
+MAX_MESSAGE_LENGTH = 4096
+
+BATCH_SEPARATOR = "\n\n"
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH):
+    """Split text into pieces of at most limit characters, on line boundaries.
+
+    Only a single line longer than limit is cut mid-line.
+    """
+    pieces = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:limit])
+            line = line[limit:]
+        if not current:
+            current = line
+        elif len(current) + 1 + len(line) <= limit:
+            current += "\n" + line
+        else:
+            pieces.append(current)
+            current = line
+    if current or not pieces:
+        pieces.append(current)
+    return pieces
+
+def pack_keyed(items, limit=MAX_MESSAGE_LENGTH, separator=BATCH_SEPARATOR):
+    """Like pack_messages for (key, message) pairs; returns (keys, text) pairs.
+
+    The keys of a text are those of the messages with a piece in it.
+    """
+    packed = []
+    for key, message in items:
+        for piece in split_message(message, limit):
+            if packed and len(packed[-1][1]) + len(separator) + len(piece) <= limit:
+                packed[-1][0].add(key)
+                packed[-1][1] += separator + piece
+            else:
+                packed.append([{key}, piece])
+    return [(keys, text) for keys, text in packed]
+
+def pack_messages(messages, limit=MAX_MESSAGE_LENGTH, separator=BATCH_SEPARATOR):
+    """Merge messages, in order, into as few texts of at most limit characters as possible"""
+    return [text for _, text in pack_keyed(enumerate(messages), limit, separator)]
+
+async def deliver(message: str) -> bool:
     """Send a message to the configured Telegram chat.
     
     Args:
@@ -37,13 +88,115 @@ async def send_message(message: str) -> bool:
     Returns:
         bool: True if message was sent successfully, False otherwise
     """
+    if bot is None:
+        return False
+    from telegram.error import RetryAfter, TelegramError
     try:
-        await bot.send_message(chat_id=CHAT_ID, text=message)
+        await bot.get().send_message(chat_id=CHAT_ID, text=message)
         return True
+    except RetryAfter as e:
+        # Flood control: wait as long as Telegram asks, then try once more
+        await asyncio.sleep(e.retry_after)
+        try:
+            await bot.get().send_message(chat_id=CHAT_ID, text=message)
+            return True
+        except TelegramError as e:
+            print(f"Failed to send message to Telegram: {e}")
+            return False
     except TelegramError as e:
         print(f"Failed to send message to Telegram: {e}")
         return False
 
+class NotificationQueue:
+    """Bounded queue of messages delivered by one background thread.
+
+    The thread owns a single long-lived event loop, so the bot's HTTP
+    session is reused across messages and no request ever waits on
+    Telegram. When the queue is full the oldest message is dropped.
+
+    Messages that arrive within batch_window seconds of the first are
+    packed into as few Telegram messages as fit the length limit, and
+    sends are at least min_interval seconds apart, so heavy traffic costs
+    a steady trickle of API calls instead of several per request.
+    """
+
+    def __init__(self, deliver, maxsize=1000, batch_window=0.0, min_interval=0.0, limit=MAX_MESSAGE_LENGTH):
+        self._deliver = deliver
+        self.maxsize = max(1, maxsize)
+        self.batch_window = batch_window
+        self.min_interval = min_interval
+        self.limit = limit
+        self._messages = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._busy = False
+        self._next_send = 0.0
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def put(self, message):
+        with self._condition:
+            if len(self._messages) >= self.maxsize:
+                self._messages.popleft()
+                self.dropped += 1
+            self._messages.append(message)
+            self.enqueued += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='telegram', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _next_batch(self):
+        """Wait for a message, then for the batch window, and take everything queued"""
+        with self._condition:
+            self._busy = False
+            self._condition.notify_all()
+            while not self._messages:
+                self._condition.wait()
+            deadline = time.monotonic() + self.batch_window
+            while len(self._messages) < self.maxsize and time.monotonic() < deadline:
+                self._condition.wait(deadline - time.monotonic())
+            batch = list(self._messages)
+            self._messages.clear()
+            self._busy = True
+        return batch
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while True:
+            for text in pack_messages(self._next_batch(), self.limit):
+                delay = self._next_send - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                try:
+                    delivered = loop.run_until_complete(self._deliver(text))
+                except Exception as e:
+                    print(f"Failed to send message to Telegram: {e}")
+                    delivered = False
+                self._next_send = time.monotonic() + self.min_interval
+                if delivered:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+
+    def flush(self, timeout=None):
+        """Wait until every queued message has been handled; False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._messages and not self._busy, timeout)
+
+    def stats(self):
+        """Counts of queued messages and of Telegram API calls made (sent, failed)"""
+        return {
+            'queued': len(self._messages),
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped
+        }
+
 def format_game_message(event_type: str, content: str) -> str:
     """Format a game event message for Telegram.
     
@@ -64,3 +217,14 @@ def format_game_message(event_type: str, content: str) -> str:
 {content}
 
 {divider}"""
+
+def format_game_round(email_content: str, character_name: str, response: str, security_checks) -> str:
+    """Format the player's email, the reply and the checks of one game round"""
+    return f"""Player's Email:
+{email_content}
+
+{character_name}'s Response:
+{response}
+
+Security Checks:
+{security_checks}"""
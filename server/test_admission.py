@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import time
+import unittest
+from admission import Admission, AsyncAdmission, Overloaded
+
+class TestAdmission(unittest.TestCase):
+    def test_queue_full_and_timeout(self):
+        admission = Admission(max_in_flight=1, max_queue=1, max_wait=0.2)
+        release = threading.Event()
+
+        def hold():
+            with admission.slot():
+                release.wait(5)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        while admission.in_flight < 1:
+            time.sleep(0.01)
+
+        errors = []
+
+        def wait_for_slot():
+            try:
+                with admission.slot():
+                    pass
+            except Overloaded as e:
+                errors.append(e)
+
+        waiter = threading.Thread(target=wait_for_slot)
+        waiter.start()
+        while admission.queued < 1:
+            time.sleep(0.01)
+        self.assertTrue(admission.saturated())
+        with self.assertRaises(Overloaded) as caught:
+            with admission.slot():
+                pass
+        self.assertEqual((caught.exception.reason, caught.exception.retry_after), ('queue_full', 1))
+
+        waiter.join()
+        self.assertEqual(errors[0].reason, 'queue_timeout')
+        release.set()
+        holder.join()
+        self.assertEqual(admission.stats()['rejected'], {'queue_full': 1, 'queue_timeout': 1})
+
+    def test_waiter_gets_released_slot(self):
+        admission = Admission(max_in_flight=2, max_queue=10, max_wait=5)
+        running = []
+        peak = []
+
+        def work():
+            with admission.slot():
+                running.append(1)
+                peak.append(len(running))
+                time.sleep(0.02)
+                running.pop()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(max(peak), 2)
+        stats = admission.stats()
+        self.assertEqual((stats['admitted'], stats['in_flight'], stats['queued']), (8, 0, 0))
+
+    def test_staggered_releases_admit_every_waiter(self):
+        admission = Admission(max_in_flight=3, max_queue=10, max_wait=2)
+        holders = [threading.Event() for _ in range(3)]
+        admitted = []
+
+        def hold(release):
+            with admission.slot():
+                release.wait(5)
+
+        def wait_for_slot(n):
+            with admission.slot():
+                admitted.append(n)
+                time.sleep(0.01)
+
+        threads = [threading.Thread(target=hold, args=(release,)) for release in holders]
+        for thread in threads:
+            thread.start()
+        while admission.in_flight < 3:
+            time.sleep(0.01)
+        waiters = [threading.Thread(target=wait_for_slot, args=(n,)) for n in range(5)]
+        for thread in waiters:
+            thread.start()
+        while admission.queued < 5:
+            time.sleep(0.01)
+        for release in holders:
+            release.set()
+            time.sleep(0.02)
+        for thread in threads + waiters:
+            thread.join()
+        self.assertEqual(sorted(admitted), list(range(5)))
+        self.assertEqual(admission.stats()['rejected'], {})
+        self.assertEqual((admission.in_flight, admission.queued), (0, 0))
+
+class TestAsyncAdmission(unittest.TestCase):
+    def test_bounds_concurrency_and_rejects_overflow(self):
+        admission = AsyncAdmission(max_in_flight=2, max_queue=2, max_wait=1)
+        running = []
+        peak = []
+
+        async def work():
+            async with admission.slot():
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.05)
+                running.pop()
+
+        async def main():
+            return await asyncio.gather(*(work() for _ in range(6)), return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertEqual(sum(isinstance(result, Overloaded) for result in results), 2)
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(admission.stats()['admitted'], 4)
+        self.assertEqual(admission.in_flight, 0)
+
+    def test_queue_timeout(self):
+        admission = AsyncAdmission(max_in_flight=1, max_queue=5, max_wait=0.05)
+
+        async def main():
+            async with admission.slot():
+                with self.assertRaises(Overloaded) as caught:
+                    async with admission.slot():
+                        pass
+            return caught.exception
+
+        self.assertEqual(asyncio.run(main()).reason, 'queue_timeout')
+        self.assertEqual(admission.queued, 0)
+
+    def test_staggered_releases_admit_every_waiter(self):
+        admission = AsyncAdmission(max_in_flight=2, max_queue=10, max_wait=1)
+        admitted = []
+
+        async def main():
+            held = [admission.slot(), admission.slot()]
+            for slot in held:
+                await slot.__aenter__()
+
+            async def waiter(n):
+                async with admission.slot():
+                    admitted.append(n)
+                    await asyncio.sleep(0.01)
+            waiters = [asyncio.create_task(waiter(n)) for n in range(5)]
+            await asyncio.sleep(0)
+            self.assertEqual(admission.queued, 5)
+            for slot in held:
+                await slot.__aexit__(None, None, None)
+                await asyncio.sleep(0.02)
+            await asyncio.gather(*waiters)
+
+        asyncio.run(main())
+        self.assertEqual(admitted, list(range(5)))
+        self.assertEqual(admission.stats()['rejected'], {})
+        self.assertEqual((admission.in_flight, admission.queued), (0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
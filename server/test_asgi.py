@@ -0,0 +1,191 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+import httpx
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ['FLASK_TESTING'] = 'true'
+
+from starlette.testclient import TestClient
+from asgi import app
+from admission import AsyncAdmission
+from llm import LocalBackend
+import game
+from config import MAX_EMAIL_BODY_CHARS, MAX_REQUEST_BYTES, MAX_SUBJECT_CHARS
+
+class TestAsgiServer(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.notify_patcher = patch('asgi.notify_async')
+        self.mock_notify = self.notify_patcher.start()
+
+    def tearDown(self):
+        self.notify_patcher.stop()
+
+    def test_health_check(self):
+        response = self.client.get('/api/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "healthy")
+
+    @patch('asgi.get_readiness')
+    def test_readiness_check(self, mock_get_readiness):
+        mock_get_readiness.return_value = []
+        self.assertEqual(self.client.get('/api/ready').json(), {'status': 'ready'})
+        mock_get_readiness.return_value = ['circuit_open']
+        response = self.client.get('/api/ready')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['reasons'], ['circuit_open'])
+
+    def test_levels(self):
+        response = self.client.get('/api/levels')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('derek', [level['name'] for level in response.json()['levels']])
+        self.assertEqual(self.client.get('/api/level/nonexistent').status_code, 404)
+
+    @patch('asgi.get_janet_response_async')
+    def test_send_email(self, mock_get_response):
+        mock_get_response.return_value = {
+            'response': 'Test response',
+            'system_prompt': 'Test system prompt',
+            'raw_input': 'Test raw input',
+            'prompt_tokens': 42
+        }
+        response = self.client.post('/api/send_email', json={
+            'from': 'test@example.com',
+            'subject': 'Test Subject',
+            'body': 'Test Content',
+            'debug': True
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['response'], 'Test response')
+        self.assertIn('urgency', data['securityChecks'])
+        self.assertEqual(data['debugInfo']['prompt_tokens'], 42)
+        self.assertEqual(self.mock_notify.call_count, 1)
+
+    @patch('asgi.stream_janet_response_async')
+    def test_send_email_stream(self, mock_stream):
+        async def events(email_content, security_results, level_name):
+            yield 'token', 'Hi '
+            yield 'token', 'there'
+            yield 'done', {'response': 'Hi there', 'system_prompt': '', 'raw_input': '', 'prompt_tokens': 7}
+        mock_stream.side_effect = events
+
+        response = self.client.post('/api/send_email/stream', json={
+            'from': 'test@example.com',
+            'subject': 'Test Subject',
+            'body': 'Test Content',
+            'debug': True
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['content-type'].startswith('text/event-stream'))
+        blocks = response.text.strip().split('\n\n')
+        self.assertEqual(blocks[0], 'event: token\ndata: {"text": "Hi "}')
+        self.assertTrue(blocks[-1].startswith('event: done\n'))
+        done = json.loads(blocks[-1].split('data: ', 1)[1])
+        self.assertEqual(done['response'], 'Hi there')
+        self.assertEqual(done['debugInfo']['prompt_tokens'], 7)
+
+    @patch('asgi.get_janet_response_async')
+    def test_stats(self, mock_get_response):
+        mock_get_response.side_effect = Exception("Backend error")
+        self.client.post('/api/send_email', json={'from': 'a@example.com', 'subject': 'Hi', 'body': 'Hello'})
+        response = self.client.get('/api/stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('upstream_calls', response.json()['coalescing']['async'])
+        self.assertIn('hit_rate', response.json()['security_check_cache'])
+        self.assertIn('urgency', response.json()['security_check_timings'])
+
+    def test_validation_errors(self):
+        self.assertEqual(self.client.post('/api/send_email', json={}).status_code, 400)
+        response = self.client.post('/api/send_email', json={
+            'from': 'test@example.com',
+            'subject': 'Test Subject',
+            'body': 'a' * (MAX_EMAIL_BODY_CHARS + 1)
+        })
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('Email bodies are limited', response.json()['description'])
+        response = self.client.post('/api/send_email', json={
+            'from': 'test@example.com',
+            'subject': 's' * (MAX_SUBJECT_CHARS + 1),
+            'body': 'Test Content'
+        })
+        self.assertIn('Email subjects are limited', response.json()['description'])
+        response = self.client.post('/api/send_email', content='{"body": "' + 'a' * MAX_REQUEST_BYTES + '"}',
+                                    headers={'content-type': 'application/json'})
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('Requests are limited', response.json()['description'])
+        response = self.client.post('/api/send_email', content='{}',
+                                    headers={'content-type': 'application/json', 'content-length': 'lots'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid Content-Length header')
+
+    @patch('asgi.get_janet_response_async')
+    def test_error_returns_ooo_email(self, mock_get_response):
+        mock_get_response.side_effect = Exception("Backend error")
+        response = self.client.post('/api/send_email', json={
+            'from': 'test@example.com',
+            'subject': 'Test Subject',
+            'body': 'Test Content'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Out of Office", response.json()['response'])
+
+    def test_overloaded_returns_503(self):
+        admission = AsyncAdmission(max_in_flight=1, max_queue=0, max_wait=5)
+
+        async def noop(*args):
+            pass
+
+        email = {'from': 'test@example.com', 'subject': 'Test Subject', 'body': 'Test Content'}
+        with patch.object(game, 'async_admission', admission), patch.object(game, 'backend', LocalBackend()), \
+                patch.object(game, 'response_cache', None), patch.object(game, 'notify_async', noop), \
+                TestClient(app) as client:
+            # Another request holds the only slot, on the app's event loop
+            held = admission.slot()
+            client.portal.call(held.__aenter__)
+            for path in ('/api/send_email', '/api/send_email/stream'):
+                response = client.post(path, json=email)
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response.headers['retry-after'], '5')
+            client.portal.call(held.__aexit__, None, None, None)
+            self.assertEqual(admission.stats()['rejected'], {'queue_full': 2})
+            self.mock_notify.assert_not_called()
+
+            response = client.post('/api/send_email/stream', json=email)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('event: done', response.text)
+            self.assertEqual(admission.in_flight, 0)
+
+    @patch('asgi.get_janet_response_async')
+    def test_requests_wait_on_upstream_concurrently(self, mock_get_response):
+        async def slow_response(email_content, security_results, level_name):
+            await asyncio.sleep(0.2)
+            return {'response': 'Hi', 'system_prompt': '', 'raw_input': '', 'prompt_tokens': 0}
+        mock_get_response.side_effect = slow_response
+
+        async def send_all():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return await asyncio.gather(*[
+                    client.post('/api/send_email', json={
+                        'from': 'test@example.com',
+                        'subject': f'Question {i}',
+                        'body': 'Hello'
+                    })
+                    for i in range(20)
+                ])
+
+        started = time.monotonic()
+        responses = asyncio.run(send_all())
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        self.assertTrue(all(r.json()['response'] == 'Hi' for r in responses))
+        # Twenty sequential upstream calls would take four seconds
+        self.assertLess(time.monotonic() - started, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import random
+import string
+import unittest
+from bktree import BKTree, levenshtein
+
+class TestBKTree(unittest.TestCase):
+    def test_levenshtein(self):
+        self.assertEqual(levenshtein("kitten", "sitting"), 3)
+        self.assertEqual(levenshtein("", "abc"), 3)
+        self.assertEqual(levenshtein("same", "same"), 0)
+        self.assertEqual(levenshtein("abcdef", "a", limit=2), 3)
+
+    def test_search_within_radius(self):
+        tree = BKTree(["mark.davidson", "laura.stiger", "sara.mangione", "roger.tillerman"])
+        self.assertEqual(tree.search("mark.davidsom", 2), [(1, "mark.davidson")])
+        self.assertEqual(tree.search("nobody.at.all", 2), [])
+        self.assertEqual(len(tree), 4)
+
+    def test_search_matches_linear_scan(self):
+        rng = random.Random(7)
+        words = {"".join(rng.choice("abc.") for _ in range(rng.randint(3, 10))) for _ in range(500)}
+        tree = BKTree(words)
+        for _ in range(20):
+            query = "".join(rng.choice(string.ascii_lowercase[:3]) for _ in range(6))
+            expected = sorted((levenshtein(query, word), word) for word in words if levenshtein(query, word) <= 2)
+            self.assertEqual(tree.search(query, 2), expected)
+
+if __name__ == '__main__':
+    unittest.main()
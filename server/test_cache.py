@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import patch
+from cache import TTLCache
+
+class TestTTLCache(unittest.TestCase):
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache(max_entries=2)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['hit_rate'], 0.5)
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_memory_budget(self):
+        cache = TTLCache(max_entries=100, max_bytes=1000, sizeof=lambda value: 100)
+        for i in range(10):
+            cache.set(i, i)
+        # Each entry weighs 200 bytes (key and value)
+        self.assertEqual(len(cache), 5)
+        self.assertLessEqual(cache.size_bytes, 1000)
+
+    def test_entries_expire(self):
+        cache = TTLCache(ttl=10)
+        with patch('cache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+        with patch('cache.time.monotonic', return_value=105):
+            self.assertEqual(cache.get('a'), 1)
+        with patch('cache.time.monotonic', return_value=111):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size_bytes, 0)
+
+if __name__ == '__main__':
+    unittest.main()
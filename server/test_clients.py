@@ -0,0 +1,39 @@
+import threading
+import unittest
+from clients import LazyClient, client_status, lazy
+
+class TestLazyClient(unittest.TestCase):
+    def test_built_once_on_first_use(self):
+        built = []
+        barrier = threading.Barrier(8)
+
+        def factory():
+            built.append(1)
+            return object()
+
+        client = LazyClient('test', factory)
+        self.assertFalse(client.created)
+        results = []
+
+        def use():
+            barrier.wait()
+            results.append(client.get())
+
+        threads = [threading.Thread(target=use) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(built), 1)
+        self.assertEqual(len(set(map(id, results))), 1)
+        self.assertTrue(client.created)
+
+    def test_set_replaces_factory(self):
+        client = lazy('test_set', lambda: self.fail('factory should not run'))
+        self.assertFalse(client_status()['test_set'])
+        client.set('fake')
+        self.assertEqual(client.get(), 'fake')
+        self.assertTrue(client_status()['test_set'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import openai
+from openai import OpenAI
+from starlette.testclient import TestClient
+from fake_openai import FakeSettings, create_app
+from loadgen import classify_reply, parse_server_timing, percentile
+
+def client_for(settings):
+    return OpenAI(api_key='test', base_url='http://testserver/v1', max_retries=0,
+                  http_client=TestClient(create_app(settings)))
+
+class TestFakeOpenAI(unittest.TestCase):
+    def test_completion(self):
+        client = client_for(FakeSettings(latency_ms=0, reply='Hi Mark'))
+        response = client.chat.completions.create(model='gpt-4o-mini', messages=[{'role': 'user', 'content': 'hello'}])
+        self.assertEqual(response.choices[0].message.content, 'Hi Mark')
+        self.assertEqual(response.model, 'gpt-4o-mini')
+
+    def test_stream(self):
+        client = client_for(FakeSettings(latency_ms=0, token_delay_ms=0, reply='Hi Mark, no.'))
+        stream = client.chat.completions.create(model='gpt-4o-mini', messages=[], stream=True)
+        deltas = [chunk.choices[0].delta.content for chunk in stream]
+        self.assertGreater(len(deltas), 3)
+        self.assertEqual(''.join(delta for delta in deltas if delta), 'Hi Mark, no.')
+
+    def test_errors_with_retry_after(self):
+        client = client_for(FakeSettings(latency_ms=0, error_rate=1.0, error_statuses=(429,), retry_after=2))
+        with self.assertRaises(openai.RateLimitError) as caught:
+            client.chat.completions.create(model='gpt-4o-mini', messages=[])
+        self.assertEqual(caught.exception.response.headers['retry-after'], '2')
+
+class TestLoadgen(unittest.TestCase):
+    def test_parse_server_timing(self):
+        self.assertEqual(parse_server_timing('checks;dur=1.5, llm;dur=250.0'), {'checks': 0.0015, 'llm': 0.25})
+        self.assertEqual(parse_server_timing(None), {})
+
+    def test_classify_reply_and_percentile(self):
+        self.assertEqual(classify_reply('I am currently Out of Office'), 'ooo_reply')
+        self.assertIsNone(classify_reply('Hi Mark'))
+        self.assertEqual(percentile(list(range(1, 101)), 0.95), 95)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+import unittest
+from importtime import parse_importtime, profile_imports, report
+
+OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:      3000 |       5000 |   openai._client
+import time:      2000 |       7000 | openai
+import time:       400 |       9000 | server
+"""
+
+class TestImportTime(unittest.TestCase):
+    def test_parse_and_report(self):
+        entries = parse_importtime(OUTPUT)
+        self.assertEqual(entries[0], ('_io', 120, 120, 2))
+        self.assertEqual(entries[-1], ('server', 400, 9000, 0))
+        text = report('server', entries, {'openai': False, 'telegram': True}, top=2)
+        self.assertIn('import server: 9.0 ms, 4 modules', text)
+        self.assertIn('5.0 ms  openai\n', text)
+        self.assertIn('Clients built at import: telegram (of openai, telegram)', text)
+
+    def test_importing_server_builds_no_clients(self):
+        entries, client_status = profile_imports('server')
+        self.assertIn('server', [name for name, _, _, depth in entries if depth == 0])
+        self.assertNotIn(True, client_status.values())
+
+    def test_importing_server_loads_no_tokenizer(self):
+        code = "import server, sys, tokens; print(tokens._encoding.cache_info().misses, 'tiktoken' in sys.modules)"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.stdout.split()[-2:], ['0', 'False'])
+
+if __name__ == '__main__':
+    unittest.main()
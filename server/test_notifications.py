@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from notifications import JsonlSink, Notifier, NullSink, NotificationSink, parse_sample_rates
+
+class ListSink(NotificationSink):
+    name = 'list'
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event_type, content):
+        self.events.append((event_type, content))
+
+class TestNotifier(unittest.TestCase):
+    def test_sampling_per_event_type(self):
+        sink = ListSink()
+        draws = iter([0.5, 0.005, 0.9])
+        notifier = Notifier([sink, NullSink()], {'GAME_ROUND': 0.01, 'API_CALL': 0}, rng=lambda: next(draws))
+        for event_type in ('ERROR', 'API_CALL', 'GAME_ROUND', 'GAME_ROUND', 'GAME_ROUND'):
+            notifier.notify(event_type, 'x')
+        self.assertEqual(sink.events, [('ERROR', 'x'), ('GAME_ROUND', 'x')])
+        stats = notifier.stats()
+        self.assertEqual(stats['sent'], {'ERROR': 1, 'GAME_ROUND': 1})
+        self.assertEqual(stats['sampled_out'], {'API_CALL': 1, 'GAME_ROUND': 2})
+
+    def test_failing_sink_does_not_stop_others(self):
+        class Broken(NotificationSink):
+            name = 'broken'
+
+            def emit(self, event_type, content):
+                raise OSError('disk full')
+
+        sink = ListSink()
+        Notifier([Broken(), sink]).notify('ERROR', 'x')
+        self.assertEqual(sink.events, [('ERROR', 'x')])
+
+    def test_async_runs_blocking_sinks_in_a_thread(self):
+        class ThreadSink(ListSink):
+            def emit(self, event_type, content):
+                self.events.append(threading.current_thread())
+
+        inline, blocking = ThreadSink(), ThreadSink()
+        blocking.blocking = True
+        asyncio.run(Notifier([inline, blocking]).notify_async('ERROR', 'x'))
+        self.assertIs(inline.events[0], threading.main_thread())
+        self.assertIsNot(blocking.events[0], threading.main_thread())
+
+    def test_parse_sample_rates(self):
+        self.assertEqual(parse_sample_rates('game_round=0.01, ERROR=1,API_CALL=2'),
+                         {'GAME_ROUND': 0.01, 'ERROR': 1.0, 'API_CALL': 1.0})
+        self.assertEqual(parse_sample_rates(None), {})
+
+class TestJsonlSink(unittest.TestCase):
+    def test_writes_and_rotates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'events.jsonl')
+            sink = JsonlSink(path, max_bytes=300, backups=2)
+            for i in range(10):
+                sink.emit('GAME_ROUND', f'round {i}')
+            sink.handler.close()
+            with open(path) as events:
+                last = [json.loads(line) for line in events][-1]
+            self.assertEqual((last['event'], last['content']), ('GAME_ROUND', 'round 9'))
+            self.assertTrue(os.path.exists(path + '.1'))
+            self.assertFalse(os.path.exists(path + '.3'))
+            self.assertEqual(sink.stats()['written'], 10)
+
+    def test_concurrent_writes_are_not_lost(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'events.jsonl')
+            sink = JsonlSink(path, max_bytes=2000, backups=1000)
+
+            def write(thread):
+                for i in range(50):
+                    sink.emit('GAME_ROUND', f'{thread}-{i}')
+            threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            sink.handler.close()
+            contents = []
+            for name in os.listdir(tmp):
+                with open(os.path.join(tmp, name)) as events:
+                    contents.extend(json.loads(line)['content'] for line in events)
+            self.assertEqual(sorted(contents), sorted(f'{n}-{i}' for n in range(8) for i in range(50)))
+
+if __name__ == '__main__':
+    unittest.main()
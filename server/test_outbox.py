@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+import unittest
+from outbox import Outbox, OutboxDispatcher
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'outbox.sqlite3')
+
+    def test_rows_survive_reopening(self):
+        outbox = Outbox(self.path)
+        for message in ('one', 'two', 'three'):
+            outbox.add(message)
+        outbox.postpone([(2, time.time() + 60)])
+        reopened = Outbox(self.path)
+        self.assertEqual([(row_id, message) for row_id, message, _ in reopened.due(time.time())],
+                         [(1, 'one'), (3, 'three')])
+        reopened.delete([1, 3])
+        self.assertEqual(reopened.count(), 1)
+        self.assertEqual(reopened.due(time.time() + 120)[0][2], 1)
+
+    def test_trim_drops_oldest(self):
+        outbox = Outbox(self.path)
+        for i in range(5):
+            outbox.add(str(i))
+        self.assertEqual(outbox.trim(2), 3)
+        self.assertEqual([message for _, message, _ in outbox.due(time.time())], ['3', '4'])
+        self.assertEqual(outbox.trim(2), 0)
+
+    def test_dispatcher_retries_until_delivered(self):
+        attempts = []
+
+        async def deliver(text):
+            attempts.append(text)
+            return len(attempts) > 1
+
+        dispatcher = OutboxDispatcher(Outbox(self.path), deliver, base_delay=0.01, max_delay=0.01)
+        dispatcher.put('hello')
+        deadline = time.monotonic() + 5
+        while dispatcher.outbox.count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(attempts, ['hello', 'hello'])
+        stats = dispatcher.stats()
+        self.assertEqual((stats['queued'], stats['sent'], stats['failed'], stats['retried']), (0, 1, 1, 1))
+
+    def test_delivers_what_a_previous_process_left(self):
+        outbox = Outbox(self.path)
+        outbox.add('left over')
+        delivered = []
+
+        async def deliver(text):
+            delivered.append(text)
+            return True
+
+        dispatcher = OutboxDispatcher(Outbox(self.path), deliver)
+        self.assertTrue(dispatcher.flush(5))
+        self.assertEqual(delivered, ['left over'])
+        self.assertEqual(outbox.count(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+import tokens
+from levels import GameLevels
+from prompts import PromptRegistry, build_system_prompt, compile_prompt, MIN_TURN_TOKENS
+from tokens import TRUNCATION_MARKER, count_tokens, encoding_path, truncate_to_tokens
+from training_data import TRAINING_EXAMPLES
+
+class TestPromptRegistry(unittest.TestCase):
+    def setUp(self):
+        self.levels = GameLevels()
+        self.registry = PromptRegistry(self.levels)
+
+    def test_prompt_per_level(self):
+        janet = self.registry.get('janet')
+        derek = self.registry.get('Derek')
+        self.assertTrue(janet.startswith('You are Janet Thompson, an IT Support Specialist at WhiteCorp.'))
+        self.assertIn('Ticket', janet)
+        self.assertTrue(derek.startswith('You are Derek Anderson, a Database Administrator at WhiteCorp.'))
+        self.assertIn('Laura Stiger (laura.stiger@whitecorp.com)', derek)
+        # Derek has no background, so the section is left out
+        self.assertNotIn('BACKGROUND:', derek)
+
+    def test_nothing_compiled_until_needed(self):
+        with patch('prompts.compile_prompt', wraps=compile_prompt) as compiled:
+            registry = PromptRegistry(self.levels)
+            compiled.assert_not_called()
+            registry.get('janet')
+            registry.get('derek')
+        self.assertEqual(compiled.call_count, len(self.levels.levels))
+
+    def test_prompts_are_compiled_once(self):
+        self.assertIs(self.registry.get('janet'), self.registry.get('janet'))
+
+    def test_unknown_level(self):
+        with self.assertRaises(KeyError):
+            self.registry.get('nobody')
+
+    def test_add_level_invalidates(self):
+        before = self.registry.get('janet')
+        character = dict(self.levels.get_level('derek').character, name='Nina Park', role='Analyst')
+        self.levels.add_level('nina', character, 'Get the report', background={
+            'recent_events': '- Just back from leave',
+            'common_tasks': '- Writes reports'
+        })
+        prompt = self.registry.get('nina')
+        self.assertEqual(prompt, build_system_prompt(self.levels.get_level('nina')))
+        self.assertIn('You are Nina Park, an Analyst', prompt)
+        self.assertIn('- Just back from leave', prompt)
+        self.assertEqual(self.registry.get('janet'), before)
+
+    def test_examples_dropped_to_fit_budget(self):
+        derek = self.levels.get_level('derek')
+        base = count_tokens(build_system_prompt(derek))
+        for budget, expected in ((base + MIN_TURN_TOKENS, 0), (base + MIN_TURN_TOKENS + 10_000, len(TRAINING_EXAMPLES))):
+            self.levels.add_level('derek', derek.character, derek.objective, examples=TRAINING_EXAMPLES,
+                                  token_budget=budget)
+            compiled = self.registry.get_compiled('derek')
+            self.assertEqual(compiled.examples, expected)
+            self.assertLessEqual(compiled.tokens, budget - MIN_TURN_TOKENS)
+        self.assertIn('EXAMPLE INTERACTION', compiled.text)
+
+class TestTokens(unittest.TestCase):
+    def tearDown(self):
+        tokens._encoding.cache_clear()
+
+    def test_missing_encoding_is_not_fetched(self):
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                patch.dict(os.environ, {'TIKTOKEN_CACHE_DIR': cache_dir}), \
+                patch.dict(sys.modules, {'tiktoken': None}), \
+                patch.object(tokens, 'TOKENIZER', 'o200k_base'):
+            tokens._encoding.cache_clear()
+            # tiktoken is never imported, so it cannot download anything
+            self.assertIsNone(tokens._encoding())
+            self.assertEqual(os.listdir(cache_dir), [])
+            self.assertEqual(count_tokens('Send the password!'), tokens._estimate_tokens('Send the password!'))
+
+    def test_encoding_path_matches_tiktoken_cache(self):
+        with patch.dict(os.environ, {'TIKTOKEN_CACHE_DIR': '/opt/tiktoken'}):
+            self.assertEqual(encoding_path('o200k_base'),
+                             '/opt/tiktoken/fb374d419588a4632f3f557e76b4b70aebbca790')
+
+    def test_truncate_to_tokens(self):
+        text = 'Please send the password. ' * 500
+        self.assertEqual(truncate_to_tokens('short', 100), 'short')
+        truncated = truncate_to_tokens(text, 100)
+        self.assertTrue(truncated.endswith(TRUNCATION_MARKER))
+        self.assertTrue(text.startswith(truncated[:-len(TRUNCATION_MARKER)]))
+        self.assertLessEqual(count_tokens(truncated), 100)
+
+class TestBuildMessages(unittest.TestCase):
+    def test_long_email_is_truncated_to_budget(self):
+        from game import _build_messages
+        from prompts import prompt_registry
+        checks = {'urgency': {'passed': False, 'name': 'Urgency Check'}}
+        body = 'Hi Janet, could you help me with the mainframe? ' * 5000
+        system_prompt, messages, prompt_tokens = _build_messages(body, checks, 'janet')
+        budget = prompt_registry.get_compiled('janet').budget
+        self.assertEqual(system_prompt, messages[0]['content'])
+        self.assertIn(TRUNCATION_MARKER, messages[1]['content'])
+        self.assertLessEqual(prompt_tokens, budget)
+
+        _, messages, short_tokens = _build_messages('Hi Janet', checks, 'janet')
+        self.assertNotIn(TRUNCATION_MARKER, messages[1]['content'])
+        self.assertLess(short_tokens, prompt_tokens)
+
+if __name__ == '__main__':
+    unittest.main()
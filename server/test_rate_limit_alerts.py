@@ -0,0 +1,59 @@
+import unittest
+from rate_limit_alerts import RateLimitAlerts
+
+class TestRateLimitAlerts(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.sent = []
+        self.alerts = RateLimitAlerts(interval=3600, top=2, notify=lambda *event: self.sent.append(event),
+                                      clock=lambda: self.now)
+
+    def test_one_summary_per_interval(self):
+        for _ in range(30):
+            self.alerts.record('10.0.0.1', '1 per 1 second')
+        for _ in range(5):
+            self.alerts.record('10.0.0.2', '1 per 1 second')
+        self.alerts.record('10.0.0.3', '1000 per 1 day')
+        self.assertEqual(self.sent, [])
+
+        self.now = 60.0
+        self.alerts.report()
+        self.assertEqual(len(self.sent), 1)
+        event_type, text = self.sent[0]
+        self.assertEqual(event_type, 'RATE_LIMIT')
+        self.assertIn('36 requests rejected in 60s (0.6/s) from 3 clients', text)
+        self.assertIn('- 1 per 1 second: 35', text)
+        self.assertIn('- 10.0.0.1: 30 (0.5/s)', text)
+        self.assertNotIn('10.0.0.3', text)
+
+    def test_quiet_interval_sends_nothing(self):
+        self.alerts.record('10.0.0.1', '1 per 1 second')
+        self.alerts.report()
+        self.alerts.report()
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.alerts.stats(), {'rejected': 1, 'pending': 0, 'summaries': 1})
+
+    def test_many_clients_stay_bounded(self):
+        alerts = RateLimitAlerts(interval=3600, top=2, notify=lambda *event: self.sent.append(event),
+                                 clock=lambda: self.now, max_clients=10)
+        for _ in range(50):
+            alerts.record('10.0.0.1', '1 per 1 second')
+        for i in range(1000):
+            alerts.record(f'192.168.{i // 256}.{i % 256}', '1 per 1 second')
+        # A heavy client that shows up late is still tracked
+        for _ in range(20):
+            alerts.record('x' * 500, '1 per 1 second')
+        self.assertLessEqual(len(alerts._clients), 10)
+        self.assertEqual(alerts.stats()['pending'], 1070)
+
+        self.now = 10.0
+        alerts.report()
+        text = self.sent[0][1]
+        self.assertIn('1070 requests rejected in 10s (107.0/s) from at least', text)
+        self.assertIn('- 10.0.0.1: 50 (5.0/s)', text)
+        self.assertIn('- ' + 'x' * 61 + '...: 20 (2.0/s)', text)
+        self.assertEqual(len(text.splitlines()), 8)
+        self.assertEqual(alerts.stats()['pending'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import openai
+from resilience import CircuitBreaker, CircuitOpenError, Resilience, retry_after
+
+REQUEST = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+
+def rate_limited(retry_after=None):
+    headers = {'retry-after': retry_after} if retry_after else {}
+    return openai.RateLimitError('slow down', response=httpx.Response(429, headers=headers, request=REQUEST), body=None)
+
+def failing(errors, result='ok'):
+    """A callable raising each of errors in turn, then returning result"""
+    errors = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+    fn.calls = calls
+    return fn
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_then_probes_and_closes(self):
+        clock = FakeClock()
+        changes = []
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, on_change=changes.append, clock=clock)
+        breaker.before_call()
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        clock.now = 10
+        breaker.before_call()
+        # Only one probe at a time while half-open
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(changes, ['open', 'half_open', 'closed'])
+        self.assertEqual(breaker.rejected, 2)
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 11
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        clock.now = 15
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+class TestRetries(unittest.TestCase):
+    def setUp(self):
+        self.slept = []
+        self.resilience = Resilience(max_attempts=3, base_delay=1, max_delay=4, sleep=self.slept.append)
+
+    def test_transient_errors_are_retried(self):
+        fn = failing([openai.APITimeoutError(REQUEST), rate_limited()])
+        self.assertEqual(self.resilience.call(fn), 'ok')
+        self.assertEqual(len(fn.calls), 3)
+        self.assertEqual(len(self.slept), 2)
+        # Full jitter stays under the exponential cap
+        self.assertLessEqual(self.slept[0], 1)
+        self.assertLessEqual(self.slept[1], 2)
+
+    def test_retry_after_is_honoured(self):
+        self.assertEqual(retry_after(rate_limited('3')), 3.0)
+        self.assertIsNone(retry_after(rate_limited('soon')))
+        self.resilience.call(failing([rate_limited('3'), rate_limited('4')]))
+        self.assertEqual(self.slept, [3.0, 4.0])
+
+    def test_retry_after_beyond_max_delay_is_raised(self):
+        fn = failing([rate_limited('3'), rate_limited('60')])
+        with self.assertRaises(openai.RateLimitError):
+            self.resilience.call(fn)
+        # Retrying before the server allows would only be refused again
+        self.assertEqual(len(fn.calls), 2)
+        self.assertEqual(self.slept, [3.0])
+        self.assertEqual(self.resilience.retries, 1)
+
+    def test_gives_up_after_max_attempts(self):
+        fn = failing([rate_limited()] * 5)
+        with self.assertRaises(openai.RateLimitError):
+            self.resilience.call(fn)
+        self.assertEqual(len(fn.calls), 3)
+
+    def test_other_errors_are_not_retried_or_counted(self):
+        fn = failing([ValueError('bad request')])
+        with self.assertRaises(ValueError):
+            self.resilience.call(fn)
+        self.assertEqual(len(fn.calls), 1)
+        self.assertEqual(self.resilience.breaker.failures, 0)
+
+    def test_open_circuit_fails_fast(self):
+        resilience = Resilience(breaker=CircuitBreaker(failure_threshold=2), max_attempts=5, sleep=lambda _: None)
+        fn = failing([rate_limited()] * 5)
+        with self.assertRaises(CircuitOpenError):
+            resilience.call(fn)
+        self.assertEqual(len(fn.calls), 2)
+        with self.assertRaises(CircuitOpenError):
+            resilience.call(fn)
+        self.assertEqual(len(fn.calls), 2)
+
+    def test_async_retries(self):
+        slept = []
+
+        async def record_sleep(delay):
+            slept.append(delay)
+        resilience = Resilience(max_attempts=2, async_sleep=record_sleep)
+        fn = failing([rate_limited('1')])
+
+        async def call():
+            return fn()
+        self.assertEqual(asyncio.run(resilience.call_async(call)), 'ok')
+        self.assertEqual(slept, [1.0])
+
+class TestHedging(unittest.TestCase):
+    def test_slow_call_is_hedged(self):
+        resilience = Resilience(hedge_percentile=90, hedge_min_samples=3)
+        for _ in range(3):
+            resilience.latency.record(0.01)
+        delays = [0.5, 0.0]
+
+        def fn():
+            time.sleep(delays.pop(0))
+            return 'reply'
+        started = time.monotonic()
+        self.assertEqual(resilience.call(fn), 'reply')
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(resilience.hedges, 1)
+
+    def test_time_queued_for_a_worker_does_not_trigger_a_hedge(self):
+        resilience = Resilience(hedge_percentile=90, hedge_min_samples=3, hedge_workers=1)
+        for _ in range(3):
+            resilience.latency.record(0.1)
+        resilience._executor = ThreadPoolExecutor(max_workers=1)
+        resilience._executor.submit(time.sleep, 0.3)
+        self.assertEqual(resilience.call(lambda: 'reply'), 'reply')
+        self.assertEqual(resilience.hedges, 0)
+
+    def test_no_hedging_without_enough_samples(self):
+        resilience = Resilience(hedge_percentile=90, hedge_min_samples=3)
+        self.assertIsNone(resilience.hedge_delay())
+
+    def test_async_hedge_cancels_loser(self):
+        resilience = Resilience(hedge_percentile=50, hedge_min_samples=1)
+        resilience.latency.record(0.01)
+        delays = [0.5, 0.0]
+        finished = []
+
+        async def fn():
+            delay = delays.pop(0)
+            await asyncio.sleep(delay)
+            finished.append(delay)
+            return 'reply'
+
+        async def run():
+            result = await resilience.call_async(fn)
+            await asyncio.sleep(0.6)
+            return result
+        self.assertEqual(asyncio.run(run()), 'reply')
+        self.assertEqual(finished, [0.0])
+
+if __name__ == '__main__':
+    unittest.main()
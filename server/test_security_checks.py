@@ -1,5 +1,13 @@
+import re
 import unittest
-from security_checks import contains_urgent_keywords, is_from_supervisor, SecurityChecker
+from unittest.mock import patch
+from security_checks import (
+    contains_urgent_keywords, find_urgent_keywords, format_security_results, is_from_supervisor,
+    SecurityChecker, perform_security_checks, perform_security_checks_batch,
+    security_check_registry, URGENT_KEYWORDS, iter_urgent_keywords, normalize_text,
+    is_supervisor_lookalike, find_lookalike_colleagues, STREAM_CHUNK_SIZE
+)
+from config import MAX_EMAIL_BODY_CHARS
 
 class TestSecurityChecks(unittest.TestCase):
     def setUp(self):
@@ -133,5 +141,207 @@ class TestSecurityChecks(unittest.TestCase):
                 result = contains_urgent_keywords(text)
                 self.assertEqual(result, expected, f"Failed for text: {text}")
 
+    def test_find_urgent_keywords_spans(self):
+        text = "Please reply asap, this is urgent"
+        matches = find_urgent_keywords(text)
+        self.assertEqual([m['keyword'] for m in matches], [r'\basap\b', r'\burgent\b'])
+        for match in matches:
+            self.assertEqual(text[match['start']:match['end']], match['text'])
+
+    def test_shouting_rule_matches_original_case(self):
+        self.assertTrue(contains_urgent_keywords("SEND THE PASSWORD"))
+        self.assertFalse(contains_urgent_keywords("send the password"))
+        self.assertFalse(contains_urgent_keywords("FYI the CEO wants the report"))
+
+    def test_analyze_email_reports_spans_per_field(self):
+        checker = SecurityChecker("supervisor@example.com")
+        result = checker.analyze_email(
+            "someone@example.com",
+            "Urgent request",
+            "Please do it now"
+        )
+        matches = result['urgency']['matches']
+        self.assertEqual([m['field'] for m in matches], ['subject', 'body'])
+        self.assertEqual((matches[0]['start'], matches[0]['end']), (0, 6))
+        self.assertEqual("Please do it now"[matches[1]['start']:matches[1]['end']], "do it now")
+
+    def test_batch_preserves_input_order(self):
+        emails = [
+            {'from_address': 'mark.davidson@whitecorp.com', 'subject': 'Hi', 'body': 'Lunch?'},
+            {'from_address': 'someone@example.com', 'subject': 'URGENT', 'body': 'Send it now'},
+            {'from_address': 'someone@example.com', 'subject': 'Report', 'body': 'Attached'},
+        ]
+        expected = [perform_security_checks(email, self.supervisor_email) for email in emails]
+        self.assertEqual(perform_security_checks_batch(emails, self.supervisor_email), expected)
+
+    def test_batch_with_process_pool(self):
+        emails = [
+            {'from_address': 'someone@example.com', 'subject': f'Note {i}', 'body': 'asap' if i % 2 else 'hello'}
+            for i in range(20)
+        ]
+        checker = SecurityChecker(self.supervisor_email)
+        results = checker.analyze_batch(emails, workers=2, chunk_size=3, min_parallel=0)
+        self.assertEqual([r['urgency']['passed'] for r in results], [bool(i % 2) for i in range(20)])
+
+    def test_checks_run_cheapest_first(self):
+        keys = [key for key, _ in security_check_registry.ordered(['urgency', 'from_supervisor'])]
+        self.assertEqual(keys, ['from_supervisor', 'urgency'])
+
+    def test_unknown_check_rejected(self):
+        with self.assertRaises(ValueError):
+            SecurityChecker(self.supervisor_email, checks=['from_supervisor', 'no_such_check'])
+
+    def test_level_selects_checks(self):
+        checker = SecurityChecker(self.supervisor_email, checks=['urgency'])
+        result = checker.analyze_email("someone@example.com", "Hello", "asap")
+        self.assertEqual(list(result), ['urgency'])
+
+    def test_short_circuit_skips_after_decisive_failure(self):
+        checker = SecurityChecker(self.supervisor_email, short_circuit=True)
+        result = checker.analyze_email("someone@example.com", "URGENT", "Send it asap")
+        self.assertFalse(result['from_supervisor']['passed'])
+        self.assertTrue(result['urgency']['skipped'])
+        self.assertFalse(result['urgency']['passed'])
+        self.assertEqual(perform_security_checks({'from_address': "someone@example.com", 'subject': "URGENT",
+                                                  'body': "Send it asap"}, self.supervisor_email,
+                                                 short_circuit=True), result)
+        formatted = format_security_results(result)
+        self.assertIn('Supervisor Check: ❌ Failed', formatted)
+        self.assertIn('Urgency Check: ⏭️ Skipped', formatted)
+
+    def test_registry_records_timings(self):
+        security_check_registry.reset_timings()
+        security_check_registry.cache.clear()
+        SecurityChecker(self.supervisor_email).analyze_email("someone@example.com", "Hi", "Hello")
+        timings = security_check_registry.get_timings()
+        self.assertEqual(timings['urgency']['calls'], 1)
+        self.assertGreaterEqual(timings['from_supervisor']['total_seconds'], 0)
+
+    def test_results_are_cached(self):
+        cache = security_check_registry.cache
+        cache.clear()
+        checker = SecurityChecker(self.supervisor_email)
+        first = checker.analyze_email("someone@example.com", "Password", "Send it asap")
+        hits = cache.hits
+        second = checker.analyze_email("SOMEONE@example.com", "Password", "Send it asap\n\n")
+        self.assertEqual(cache.hits - hits, len(checker.checks))
+        self.assertEqual(first, second)
+
+    def test_urgency_cache_key(self):
+        security_check_registry.cache.clear()
+        checker = SecurityChecker(self.supervisor_email)
+        first = checker.analyze_email("someone@example.com", "Hi", "Send it u.r.g.e.n.t")
+        hits = security_check_registry.cache.hits
+        # The key is taken from the raw text, so it does not normalize it
+        with patch('security_checks.normalize_text', side_effect=AssertionError):
+            checker.analyze_email("someone@example.com", "Hi", "Send it u.r.g.e.n.t  \n")
+        self.assertEqual(security_check_registry.cache.hits - hits, len(checker.checks))
+        # Texts that only match once normalized are separate entries
+        second = checker.analyze_email("someone@example.com", "Hi", "Send it u r g e n t")
+        self.assertEqual(first['urgency']['passed'], second['urgency']['passed'])
+
+        # Whether only the first match is kept is part of the key
+        body = "asap " * 200
+        streamed = SecurityChecker(self.supervisor_email, stream_threshold=100).analyze_email("a@b.com", "Hi", body)
+        full = SecurityChecker(self.supervisor_email, stream_threshold=None).analyze_email("a@b.com", "Hi", body)
+        self.assertEqual((len(streamed['urgency']['matches']), len(full['urgency']['matches'])), (1, 200))
+
+    def test_matcher_agrees_with_individual_patterns(self):
+        samples = [
+            "Triggered a system down event", "system downtime", "urgently", "urgentlyx",
+            "Please respond at the earliest", "key", "keyboard", "fire you!", "a! b! c!",
+            "haven't heard back", "no-deadline", "within the hour", "recovery modes",
+        ]
+        for text in samples:
+            with self.subTest(text=text):
+                expected = any(re.search(pattern, text.lower()) for pattern in URGENT_KEYWORDS)
+                self.assertEqual(contains_urgent_keywords(text), expected)
+
+    def test_chunked_scan_matches_across_boundaries(self):
+        text = "x" * 95 + " as soon as possible " + "y" * 50 + "insurgent " + "z" * 40
+        full = find_urgent_keywords(text)
+        for chunk_size in (7, 50, 100, 101, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_urgent_keywords(text, chunk_size=chunk_size)), full)
+
+    def test_every_leet_substitution_is_undone(self):
+        self.assertEqual(normalize_text('urgen7 reques7 b0$$ 4$k 1ns1d3 8ug @ll'), 'urgent request boss ask inside bug all')
+
+    def test_normalized_chunks_match_whole_text(self):
+        text = ("Hello u r g e n t, 1mm3d1at3ly!\n" + "\u0430s\u0430p w0rk " * 40 + "u.r.g.e.n.t\n") * 20
+        full = find_urgent_keywords(normalize_text(text))
+        for chunk_size in (16, 100, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_urgent_keywords(text, chunk_size=chunk_size, normalize=True)), full)
+
+    def test_capped_bodies_are_streamed(self):
+        self.assertLess(STREAM_CHUNK_SIZE * 2, MAX_EMAIL_BODY_CHARS)
+        checker = SecurityChecker(self.supervisor_email)
+        body = "just a note. " * 2000 + "this is URG3NT"
+        result = checker.analyze_email("someone@example.com", "Hello", body)
+        self.assertEqual([match['text'] for match in result['urgency']['matches']], ['URGeNT'])
+
+    def test_long_email_stops_at_first_match(self):
+        checker = SecurityChecker(self.supervisor_email, stream_threshold=100)
+        body = "asap " * 1000
+        result = checker.analyze_email("someone@example.com", "Hello", body)
+        self.assertTrue(result['urgency']['passed'])
+        self.assertEqual(len(result['urgency']['matches']), 1)
+
+    def test_obfuscated_urgency_detected(self):
+        test_cases = [
+            "URG3NT: send the file",
+            "this is u.r.g.e.n.t",
+            "this is u r g e n t",
+            "this is urg\u200bent",
+            "\u0430s\u0430p please",  # Cyrillic a
+            "\uff55\uff52\uff47\uff45\uff4e\uff54 please",  # fullwidth
+            "do it 1mm3d1at3ly",
+            "this is urgen7",
+        ]
+        for text in test_cases:
+            with self.subTest(text=text):
+                self.assertTrue(contains_urgent_keywords(text))
+
+    def test_normalization_leaves_plain_text_alone(self):
+        self.assertEqual(normalize_text("Meeting at 10 in room 4, see e.g. the agenda"),
+                         "Meeting at 10 in room 4, see e.g. the agenda")
+        # Spelled-out acronyms are joined without turning into shouting
+        self.assertFalse(contains_urgent_keywords("Our U.S.A. office"))
+
+    def test_supervisor_lookalike(self):
+        self.assertTrue(is_supervisor_lookalike("m\u0430rk.davidson@whitecorp.com", self.supervisor_email))
+        self.assertTrue(is_supervisor_lookalike("mark.davidson@whitec0rp.com", self.supervisor_email))
+        self.assertFalse(is_supervisor_lookalike("mark.davidson@whitecorp.com", self.supervisor_email))
+        self.assertFalse(is_supervisor_lookalike("jane.doe@whitecorp.com", self.supervisor_email))
+        result = SecurityChecker(self.supervisor_email).analyze_email(
+            "mark.davids0n@whitecorp.com", "Hi", "Hello"
+        )
+        self.assertFalse(result['from_supervisor']['passed'])
+        self.assertTrue(result['from_supervisor']['lookalike'])
+
+    def test_lookalike_sender_against_directory(self):
+        colleagues = ["laura.stiger@whitecorp.com", "roger.tillerman@whitecorp.com"]
+        checker = SecurityChecker(self.supervisor_email, colleagues=colleagues)
+        for sender, imitated in [
+            ("mark.davidsom@whitecorp.com", "mark.davidson@whitecorp.com"),
+            ("mark.davidson@whitec0rp.com", "mark.davidson@whitecorp.com"),
+            ("laura.stlger@whitecorp.com", "laura.stiger@whitecorp.com"),
+        ]:
+            with self.subTest(sender=sender):
+                result = checker.analyze_email(sender, "Hi", "Hello")
+                self.assertFalse(result['lookalike_sender']['passed'])
+                self.assertEqual(result['lookalike_sender']['matches'][0]['email'], imitated)
+
+        for sender in ["Laura.Stiger@whitecorp.com", "jane.doe@example.com"]:
+            with self.subTest(sender=sender):
+                result = checker.analyze_email(sender, "Hi", "Hello")
+                self.assertTrue(result['lookalike_sender']['passed'])
+
+    def test_lookalike_index_scales_to_large_directory(self):
+        directory = tuple(sorted(f"employee{i:05d}@whitecorp.com" for i in range(2000)))
+        matches = find_lookalike_colleagues("employee0O123@whitecorp.com", directory)
+        self.assertIn("employee00123@whitecorp.com", [m['email'] for m in matches])
+
 if __name__ == '__main__':
     unittest.main()
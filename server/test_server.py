@@ -72,7 +72,7 @@ class TestServer(unittest.TestCase):
         )
         
         # Mock GameLevels
-        self.patcher = patch('server.game_levels')
+        self.patcher = patch('api.game_levels')
         self.mock_game_levels = self.patcher.start()
         self.mock_game_levels.levels = {
             'janet': self.janet_level,
@@ -80,25 +80,16 @@ class TestServer(unittest.TestCase):
         }
         self.mock_game_levels.get_level.side_effect = lambda x: self.mock_game_levels.levels.get(x)
 
-        # Mock Janet responses
-        self.janet_patcher = patch('server.janet')
-        self.mock_janet = self.janet_patcher.start()
-        self.mock_janet.knowledge = {
-            'email': 'janet.thompson@whitecorp.com',
-            'supervisor_email': 'supervisor@company.com'
-        }
-
         # Mock Telegram bot
-        self.telegram_patcher = patch('server.send_message')
-        self.mock_send_message = self.telegram_patcher.start()
+        self.notify_patcher = patch('server.notify')
+        self.mock_notify = self.notify_patcher.start()
 
         logger.info('✓ Test setup complete')
 
     def tearDown(self):
         """Clean up mocks"""
         self.patcher.stop()
-        self.janet_patcher.stop()
-        self.telegram_patcher.stop()
+        self.notify_patcher.stop()
         logger.info('✓ Test teardown complete\n')
 
     def assertResponseValid(self, response, expected_status):
@@ -139,6 +130,21 @@ class TestServer(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(data["status"], "healthy")
 
+    @patch('server.get_readiness')
+    def test_readiness_check(self, mock_get_readiness):
+        """Test that readiness reports saturation separately from liveness"""
+        logger.info('➤ Testing readiness endpoint')
+        mock_get_readiness.return_value = []
+        response = self.client.get('/api/ready')
+        self.assertResponseValid(response, 200)
+        self.assertEqual(json.loads(response.data)['status'], 'ready')
+
+        mock_get_readiness.return_value = ['queue_saturated']
+        response = self.client.get('/api/ready')
+        self.assertResponseValid(response, 503)
+        self.assertEqual(json.loads(response.data)['reasons'], ['queue_saturated'])
+        self.assertResponseValid(self.client.get('/api/health'), 200)
+
     def test_get_available_levels(self):
         """Test that the levels endpoint returns the correct format"""
         logger.info('➤ Testing available levels endpoint')
@@ -162,7 +168,7 @@ class TestServer(unittest.TestCase):
         self.assertResponseValid(response, 404)
 
     @patch('server.get_janet_response')
-    @patch('server.perform_security_checks')
+    @patch('api.perform_security_checks')
     def test_rate_limit_disabled(self, mock_security_checks, mock_get_response):
         """Test that rate limiting is disabled during tests"""
         logger.info('➤ Testing rate limiting disabled state')
@@ -175,7 +181,8 @@ class TestServer(unittest.TestCase):
         mock_get_response.return_value = {
             'response': 'Test response',
             'system_prompt': 'Test system prompt',
-            'raw_input': 'Test raw input'
+            'raw_input': 'Test raw input',
+            'prompt_tokens': 42
         }
 
         # Make multiple requests in quick succession
@@ -194,7 +201,7 @@ class TestServer(unittest.TestCase):
             )
 
     @patch('server.get_janet_response')
-    @patch('server.perform_security_checks')
+    @patch('api.perform_security_checks')
     def test_email_endpoint(self, mock_security_checks, mock_get_response):
         """Test the email endpoint basic functionality"""
         logger.info('➤ Testing email endpoint')
@@ -207,7 +214,8 @@ class TestServer(unittest.TestCase):
         mock_get_response.return_value = {
             'response': 'Test response',
             'system_prompt': 'Test system prompt',
-            'raw_input': 'Test raw input'
+            'raw_input': 'Test raw input',
+            'prompt_tokens': 42
         }
 
         # Test valid email
@@ -222,6 +230,7 @@ class TestServer(unittest.TestCase):
         self.assertResponseValid(response, 200)
         data = json.loads(response.data)
         self.assertSchemaValid(data, 'email_response')
+        self.assertRegex(response.headers['Server-Timing'], r'^checks;dur=[\d.]+, llm;dur=[\d.]+, notify;dur=[\d.]+$')
 
         # Test invalid email format
         invalid_email = {
@@ -238,7 +247,7 @@ class TestServer(unittest.TestCase):
         self.assertResponseValid(response, 400)
 
     @patch('server.get_janet_response')
-    @patch('server.perform_security_checks')
+    @patch('api.perform_security_checks')
     def test_reject_unknown_fields(self, mock_security_checks, mock_get_response):
         """Test that the email endpoint rejects unknown fields"""
         logger.info('➤ Testing email endpoint with unknown fields')
@@ -251,7 +260,8 @@ class TestServer(unittest.TestCase):
         mock_get_response.return_value = {
             'response': 'Test response',
             'system_prompt': 'Test system prompt',
-            'raw_input': 'Test raw input'
+            'raw_input': 'Test raw input',
+            'prompt_tokens': 42
         }
 
         # Test email with unknown field
@@ -267,7 +277,7 @@ class TestServer(unittest.TestCase):
             self.assertSchemaValid(email_data, 'email_request')
 
     @patch('server.get_janet_response')
-    @patch('server.perform_security_checks')
+    @patch('api.perform_security_checks')
     def test_accept_valid_fields(self, mock_security_checks, mock_get_response):
         """Test that the email endpoint accepts valid fields"""
         logger.info('➤ Testing email endpoint with valid fields')
@@ -280,7 +290,8 @@ class TestServer(unittest.TestCase):
         mock_get_response.return_value = {
             'response': 'Test response',
             'system_prompt': 'Test system prompt',
-            'raw_input': 'Test raw input'
+            'raw_input': 'Test raw input',
+            'prompt_tokens': 42
         }
 
         # Test email with all valid fields
@@ -404,6 +415,95 @@ class TestServer(unittest.TestCase):
         self.assertIn("System Administrator", data['response'])
         self.assertNotIn("Janet", data['response'])  # Make sure it's not using Janet's details
 
+    @patch('server.get_janet_response')
+    def test_oversized_body_rejected(self, mock_get_response):
+        """Test that email bodies over the size limit get a clean 413"""
+        logger.info('➤ Testing oversized email body')
+        response = self.client.post('/api/send_email', json={
+            'from': 'test@example.com',
+            'subject': 'Test Subject',
+            'body': 'a' * (MAX_EMAIL_BODY_CHARS + 1)
+        })
+        self.assertResponseValid(response, 413)
+        self.assertIn('Email bodies are limited', json.loads(response.data)['description'])
+
+        response = self.client.post('/api/send_email', json={
+            'from': 'test@example.com',
+            'subject': 's' * (MAX_SUBJECT_CHARS + 1),
+            'body': 'Test Content'
+        })
+        self.assertResponseValid(response, 413)
+        self.assertIn('Email subjects are limited', json.loads(response.data)['description'])
+        mock_get_response.assert_not_called()
+
+        # Requests over MAX_CONTENT_LENGTH are refused before parsing
+        response = self.client.post(
+            '/api/send_email',
+            data='{"body": "' + 'a' * app.config['MAX_CONTENT_LENGTH'] + '"}',
+            content_type='application/json'
+        )
+        self.assertResponseValid(response, 413)
+        self.assertIn('Requests are limited', json.loads(response.data)['description'])
+        self.mock_notify.assert_not_called()
+
+    @patch('server.stream_janet_response')
+    def test_send_email_stream(self, mock_stream):
+        """Test that the streaming endpoint sends tokens, then the full response"""
+        logger.info('➤ Testing streaming email endpoint')
+        mock_stream.return_value = iter([
+            ('token', 'Hi '),
+            ('token', 'there'),
+            ('done', {'response': 'Hi there', 'system_prompt': 'Test system prompt',
+                      'raw_input': 'Test raw input', 'prompt_tokens': 42})
+        ])
+
+        response = self.client.post('/api/send_email/stream', json={
+            'from': 'test@example.com',
+            'subject': 'Test Subject',
+            'body': 'Test Content',
+            'debug': True
+        })
+        self.assertResponseValid(response, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = [
+            (block.split('\n')[0][len('event: '):], json.loads(block.split('\n')[1][len('data: '):]))
+            for block in response.get_data(as_text=True).strip().split('\n\n')
+        ]
+        self.assertEqual(events[:2], [('token', {'text': 'Hi '}), ('token', {'text': 'there'})])
+        event, data = events[-1]
+        self.assertEqual(event, 'done')
+        self.assertSchemaValid(data, 'email_response')
+        self.assertEqual(data['response'], 'Hi there')
+        self.assertIn('urgency', data['securityChecks'])
+        self.assertEqual(self.mock_notify.call_count, 1)
+
+        # Validation errors are still plain JSON
+        response = self.client.post('/api/send_email/stream', json={})
+        self.assertResponseValid(response, 400)
+
+    def test_overloaded_returns_503(self):
+        """Test that requests the server has no room for get a fast 503 with Retry-After"""
+        logger.info('➤ Testing admission control rejection')
+        admission = Admission(max_in_flight=1, max_queue=0, max_wait=5)
+        email = {'from': 'test@example.com', 'subject': 'Test Subject', 'body': 'Test Content'}
+        with patch.object(game, 'admission', admission), patch.object(game, 'backend', LocalBackend()), \
+                patch.object(game, 'response_cache', None), patch.object(game, 'notify'):
+            # Another request holds the only slot
+            with admission.slot():
+                for path in ('/api/send_email', '/api/send_email/stream'):
+                    response = self.client.post(path, json=email)
+                    self.assertResponseValid(response, 503)
+                    self.assertEqual(response.headers['Retry-After'], '5')
+                    self.assertIn('error', json.loads(response.data))
+            self.assertEqual(admission.stats()['rejected'], {'queue_full': 2})
+            self.mock_notify.assert_not_called()
+
+            # Once it is free, the stream goes through and gives the slot back
+            response = self.client.post('/api/send_email/stream', json=email)
+            self.assertResponseValid(response, 200)
+            self.assertIn('event: done', response.get_data(as_text=True))
+            self.assertEqual(admission.in_flight, 0)
+
     def test_derek_level_exists(self):
         """Test that the Derek level exists and has correct information"""
         logger.info('➤ Testing Derek level exists')
@@ -438,8 +538,12 @@ os.environ['FLASK_TESTING'] = 'true'
 
 # Import server modules
 from server import app
+from config import MAX_EMAIL_BODY_CHARS, MAX_SUBJECT_CHARS
 from levels import GameLevels, Level
 from security_checks import SecurityChecker, perform_security_checks
+from admission import Admission
+from llm import LocalBackend
+import game
 
 if __name__ == '__main__':
     unittest.main()
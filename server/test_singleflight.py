@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+import unittest
+from singleflight import SingleFlight, AsyncSingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_result(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return 'reply'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', slow))) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        while flight.stats()['coalesced'] < 9:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['reply'] * 10)
+        stats = flight.stats()
+        self.assertEqual((stats['upstream_calls'], stats['coalesced'], stats['in_flight']), (1, 9, 0))
+        self.assertEqual(stats['coalesce_rate'], 0.9)
+
+    def test_errors_are_shared_and_not_remembered(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('key', lambda: (_ for _ in ()).throw(ValueError('boom')))
+        # A finished call is not reused
+        self.assertEqual(flight.do('key', lambda: 'ok'), 'ok')
+        self.assertEqual(flight.stats()['upstream_calls'], 2)
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_result(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'reply'
+
+        async def run():
+            first = await asyncio.gather(*[flight.do('a', slow) for _ in range(5)], flight.do('b', slow))
+            second = await flight.do('a', slow)
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first, ['reply'] * 6)
+        self.assertEqual(second, 'reply')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(flight.stats()['coalesced'], 4)
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return 'reply'
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do('a', slow))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do('a', slow))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(run()), 'reply')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+import unittest
+from telegram_bot import NotificationQueue, pack_messages, split_message
+
+class TestNotificationQueue(unittest.TestCase):
+    def test_batches_messages_in_window(self):
+        delivered = []
+
+        async def deliver(message):
+            await asyncio.sleep(0)
+            delivered.append(message)
+            return True
+
+        queue = NotificationQueue(deliver, batch_window=0.2)
+        for message in ('one', 'two', 'three'):
+            queue.put(message)
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(delivered, ['one\n\ntwo\n\nthree'])
+        self.assertEqual(queue.stats(), {'queued': 0, 'enqueued': 3, 'sent': 1, 'failed': 0, 'dropped': 0})
+
+    def test_drops_oldest_when_full(self):
+        started = threading.Event()
+        release = threading.Event()
+        delivered = []
+
+        async def deliver(message):
+            started.set()
+            await asyncio.get_running_loop().run_in_executor(None, release.wait, 5)
+            delivered.append(message)
+            return message != 'first'
+
+        queue = NotificationQueue(deliver, maxsize=2)
+        queue.put('first')
+        started.wait(5)
+        for message in ('a', 'b', 'c', 'd'):
+            queue.put(message)
+        release.set()
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(delivered, ['first', 'c\n\nd'])
+        stats = queue.stats()
+        self.assertEqual((stats['dropped'], stats['sent'], stats['failed']), (2, 1, 1))
+
+    def test_sends_are_spaced(self):
+        sent_at = []
+
+        async def deliver(message):
+            sent_at.append(time.monotonic())
+            return True
+
+        queue = NotificationQueue(deliver, min_interval=0.1, limit=10)
+        queue.put('x' * 25)
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(len(sent_at), 3)
+        self.assertGreaterEqual(sent_at[2] - sent_at[0], 0.2)
+
+class TestPacking(unittest.TestCase):
+    def test_split_on_line_boundaries(self):
+        text = 'aaaa\nbbbb\ncccc'
+        self.assertEqual(split_message(text, 9), ['aaaa\nbbbb', 'cccc'])
+        self.assertEqual(split_message('x' * 10, 4), ['xxxx', 'xxxx', 'xx'])
+        self.assertEqual(split_message(text, 100), [text])
+        self.assertEqual(split_message(''), [''])
+
+    def test_pack_within_limit(self):
+        messages = ['a' * 2000, 'b' * 2000, 'c' * 5000, 'd']
+        packed = pack_messages(messages)
+        self.assertTrue(all(len(text) <= 4096 for text in packed))
+        self.assertEqual(len(packed), 3)
+        self.assertEqual(''.join(packed).replace('\n', ''), ''.join(messages))
+
+if __name__ == '__main__':
+    unittest.main()
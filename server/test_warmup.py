@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import game
+from llm import LLMBackend
+from warmup import WarmUp
+
+class CountingBackend(LLMBackend):
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.warmed = []
+
+    def build_clients(self):
+        self.warmed.append('clients')
+
+    def warm_up(self):
+        self.warmed.append('sync')
+        if self.fail:
+            raise ConnectionError('unreachable')
+
+    async def warm_up_async(self):
+        self.warmed.append('async')
+
+class TestWarmUp(unittest.TestCase):
+    def test_not_ready_until_warmed(self):
+        warmup = WarmUp(True)
+        with patch.object(game, 'warmup', warmup):
+            self.assertIn('warming_up', game.get_readiness())
+            backend = CountingBackend()
+            warmup.run(backend)
+            self.assertNotIn('warming_up', game.get_readiness())
+        self.assertEqual(backend.warmed, ['clients', 'sync'])
+        self.assertEqual(set(warmup.stats()['timings_ms']),
+                         {'prompts', 'tokens', 'security_checks', 'clients', 'connections'})
+
+    def test_failed_step_still_finishes(self):
+        warmup = WarmUp(True)
+        warmup.run(CountingBackend(fail=True))
+        self.assertFalse(warmup.pending)
+        self.assertEqual(warmup.stats()['errors'], {'connections': 'unreachable'})
+
+    def test_async_warms_async_connections(self):
+        warmup = WarmUp(True)
+        backend = CountingBackend()
+        asyncio.run(warmup.run_async(backend))
+        self.assertEqual(backend.warmed, ['clients', 'async'])
+        self.assertFalse(warmup.pending)
+
+    def test_disabled_is_ready(self):
+        self.assertFalse(WarmUp(False).pending)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import functools
+import hashlib
+import os
+import re
+import tempfile
+
+# Encoding of the gpt-4o family; PROMPT_TOKENIZER=estimate skips tiktoken
+TOKENIZER = os.getenv("PROMPT_TOKENIZER", "o200k_base")
+
+# Where tiktoken downloads each encoding from. The server never does: the
+# image fetches the file into TIKTOKEN_CACHE_DIR at build time (see the
+# Dockerfile, or run `python tokens.py` once), and tokens are estimated if
+# it is missing.
+ENCODING_URLS = {
+    "o200k_base": "https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+    "cl100k_base": "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+}
+
+# Rough per-message framing the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = "\n[... email truncated ...]\n"
+
+_PIECES = re.compile(r'\w+|[^\w\s]')
+
+def encoding_path(name):
+    """The file tiktoken reads the encoding from, named as tiktoken's own cache names it"""
+    cache_dir = (os.environ.get("TIKTOKEN_CACHE_DIR") or os.environ.get("DATA_GYM_CACHE_DIR")
+                 or os.path.join(tempfile.gettempdir(), "data-gym-cache"))
+    return os.path.join(cache_dir, hashlib.sha1(ENCODING_URLS[name].encode()).hexdigest())
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    """The tiktoken encoding, or None when tiktoken or its local data is unavailable"""
+    if TOKENIZER == "estimate":
+        return None
+    if TOKENIZER not in ENCODING_URLS:
+        print(f"Token counts are estimated, unknown PROMPT_TOKENIZER {TOKENIZER!r}")
+        return None
+    path = encoding_path(TOKENIZER)
+    if not os.path.exists(path):
+        # Loading it now would download it in the middle of a request
+        print(f"Token counts are estimated, the {TOKENIZER} encoding is not at {path}. "
+              f"Set TIKTOKEN_CACHE_DIR and run `python tokens.py` to fetch it.")
+        return None
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER)
+    except Exception as e:
+        print(f"Token counts are estimated, tiktoken is unavailable: {str(e)}")
+        return None
+
+def _estimate_tokens(text):
+    # About four characters per token for words, one per punctuation mark
+    return sum(1 + (len(piece) - 1) // 4 for piece in _PIECES.findall(text))
+
+def count_tokens(text):
+    encoding = _encoding()
+    if encoding is None:
+        return _estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def count_message_tokens(messages):
+    return sum(count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+def truncate_to_tokens(text, max_tokens, marker=TRUNCATION_MARKER):
+    """Cut text down to max_tokens, ending it with marker if anything was dropped"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - count_tokens(marker))
+    # Longest prefix that fits, found by bisecting on the character count
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= keep:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + marker
+
+if __name__ == '__main__':
+    # Fetch the encoding into TIKTOKEN_CACHE_DIR ahead of time
+    import tiktoken
+    tiktoken.get_encoding(TOKENIZER)
+    print(f"{TOKENIZER} encoding saved to {encoding_path(TOKENIZER)}")
@@ -1,3 +1,6 @@
+from prompts import fit_examples
+from tokens import count_tokens
+
 # Sample interactions to help shape Janet's character and responses
 TRAINING_EXAMPLES = [
     {
@@ -200,8 +203,11 @@ Janet
     }
 ]
 
-def get_training_prompt(janet):
-    """Generate a comprehensive training prompt based on Janet's character and example interactions"""
+def get_training_prompt(janet, max_tokens=None):
+    """Generate a comprehensive training prompt based on Janet's character and example interactions.
+
+    With max_tokens, trailing examples are dropped until the prompt fits.
+    """
     prompt = f"""You are {janet.name}, {janet.role}.
 
 CHARACTER PROFILE:
@@ -246,8 +252,12 @@ SECURITY PROTOCOL:
 Here are some example interactions to guide your responses:
 """
 
+    examples = TRAINING_EXAMPLES
+    if max_tokens is not None:
+        examples = fit_examples(examples, max_tokens - count_tokens(prompt))
+
     # Add example interactions
-    for example in TRAINING_EXAMPLES:
+    for example in examples:
         prompt += f"\nEXAMPLE INTERACTION:\n{example['email']}\nYOUR RESPONSE:\n{example['response']}\n"
 
     return prompt